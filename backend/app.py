@@ -6,8 +6,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
-from database import init_db
-from routes import auth, products, cart, reservations, orders
+from database import SessionLocal, init_db
+from routes import auth, products, cart, reservations, orders, analytics
+from utils.password_pool import password_pool
+from utils.revocation import purge_expired_tokens, revocation_filter
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +44,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permite todos os métodos (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Permite todos os headers
+    expose_headers=["X-Next-Cursor", "ETag", "Idempotent-Replayed", "Retry-After"],
 )
 
 
@@ -54,9 +57,23 @@ def on_startup():
     logger.info("🚀 Iniciando GeekHaven Brew API...")
     init_db()
     logger.info("✅ Banco de dados inicializado!")
+    # Limpeza de tokens expirados fora do caminho das requisições
+    with SessionLocal() as db:
+        purge_expired_tokens(db)
+        revocation_filter.load(db)
+    password_pool.start()
+    logger.info(f"🔐 Pool de senhas iniciado ({password_pool.workers} processo(s))")
     logger.info("📚 Documentação disponível em: http://localhost:8000/docs")
 
 
+@app.on_event("shutdown")
+def on_shutdown():
+    """
+    Executado quando o servidor encerra
+    """
+    password_pool.shutdown()
+
+
 # Rotas
 @app.get("/")
 def root():
@@ -73,7 +90,8 @@ def root():
             "products": "/api/products",
             "cart": "/api/cart",
             "reservations": "/api/reservations",
-            "orders": "/api/orders"
+            "orders": "/api/orders",
+            "analytics": "/api/analytics"
         }
     }
 
@@ -96,20 +114,38 @@ app.include_router(products.router)
 app.include_router(cart.router)
 app.include_router(reservations.router)
 app.include_router(orders.router)
+app.include_router(analytics.router)
 
 # Adiciona rota alternativa para produtos (sem /api prefix)
-from fastapi import Depends
+from typing import List, Optional
+from fastapi import Depends, Query, Request
 from sqlalchemy.orm import Session
 from database import get_db
-from models import Product
-
-@app.get("/products")
-def get_all_products_alt(db: Session = Depends(get_db)):
+from schemas import ProductResponse
+
+@app.get("/products", response_model=List[ProductResponse])
+def get_all_products_alt(
+    request: Request,
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: bool = False,
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: int = Query(products.DEFAULT_PAGE_SIZE, ge=1, le=products.MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
     """
-    Lista todos os produtos (público) - rota alternativa sem /api
+    Lista produtos (público) - rota alternativa sem /api
     """
-    products = db.query(Product).all()
-    return products
+    return products.list_products(
+        db, request,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        cursor=cursor,
+        limit=limit
+    )
 
 
 # Handler de erros global
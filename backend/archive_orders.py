@@ -0,0 +1,20 @@
+"""
+Script para arquivar pedidos concluídos/cancelados antigos
+Uso: python archive_orders.py [dias]   (padrão: ORDER_ARCHIVE_DAYS ou 90)
+"""
+import sys
+from database import SessionLocal, init_db
+from utils.archive import archive_orders, ARCHIVE_AFTER_DAYS
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_AFTER_DAYS
+    init_db()
+    db = SessionLocal()
+    try:
+        archived = archive_orders(db, older_than_days=days)
+        print(f"📦 {archived} pedido(s) com mais de {days} dia(s) arquivado(s)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -19,8 +19,20 @@ else:
     SQLALCHEMY_DATABASE_URL = "sqlite:///./cafeteria.db"
     connect_args = {"check_same_thread": False}
 
+# Pool de conexões: cada requisição passa por várias threads do threadpool
+# do FastAPI (40 threads) segurando a mesma conexão. Com menos conexões do
+# que threads, as 40 threads podem ficar esperando conexão enquanto quem
+# tem conexão espera uma thread livre, e tudo trava até o pool_timeout.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "20"))
+
 # Criar engine do SQLAlchemy
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args=connect_args,
+    pool_size=POOL_SIZE,
+    max_overflow=POOL_MAX_OVERFLOW
+)
 
 # Criar SessionLocal para interagir com o banco
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -44,4 +56,12 @@ def init_db():
     Inicializa o banco de dados criando todas as tabelas
     """
     Base.metadata.create_all(bind=engine)
+
+    # Colunas novas em tabelas já existentes
+    from utils.migrations import run_migrations
+    run_migrations()
+
+    # Índice de busca textual (FTS5/tsvector) mantido por triggers
+    from utils.search import init_search_index
+    init_search_index()
     print("✅ Banco de dados inicializado com sucesso!")
@@ -1,7 +1,7 @@
 """
 Modelos do banco de dados usando SQLAlchemy ORM
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -54,7 +54,7 @@ class Product(Base):
     description = Column(String)
     price = Column(Float, nullable=False)
     image = Column(String)
-    category = Column(String)
+    category = Column(String, index=True)
     stock = Column(Integer, default=0)
     
     # Relacionamentos
@@ -65,25 +65,71 @@ class Product(Base):
 class Reservation(Base):
     """Modelo de Reserva"""
     __tablename__ = "reservations"
+    __table_args__ = (
+        Index("ix_reservations_date_time", "date", "time"),
+        # Consultas por período (listagens, ocupação do dia)
+        Index("ix_reservations_starts_at_status", "starts_at", "status"),
+        Index("ix_reservations_user_starts_at", "user_id", "starts_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(String, nullable=False)  # Formato: YYYY-MM-DD
     time = Column(String, nullable=False)  # Formato: HH:MM
+    starts_at = Column(DateTime)  # date + time tipados (indexável)
     people_count = Column(Integer, nullable=False)
     status = Column(Enum(ReservationStatus), default=ReservationStatus.PENDING)
     created_at = Column(DateTime, default=datetime.utcnow)
+    table_id = Column(Integer, ForeignKey("dining_tables.id"))  # Mesa alocada
+    duration_minutes = Column(Integer)  # Duração prevista da reserva
     
     # Relacionamentos
     user = relationship("User", back_populates="reservations")
+    table = relationship("DiningTable")
+
+
+class DiningTable(Base):
+    """Mesa do salão (usada na alocação de reservas)"""
+    __tablename__ = "dining_tables"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    seats = Column(Integer, nullable=False)
+
+
+class RefreshToken(Base):
+    """Refresh token (guardado como hash SHA-256; rotacionado a cada uso)"""
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(32), index=True, nullable=False)  # Mesmo login, todas as rotações
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime)
+
+
+class RevokedToken(Base):
+    """Access token revogado (pelo jti) até a sua expiração"""
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
 
 
 class Order(Base):
     """Modelo de Pedido"""
     __tablename__ = "orders"
+    __table_args__ = (
+        # Paginação por (created_at, id)
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        # Seleção de pedidos finalizados para arquivamento
+        Index("ix_orders_status_created_at", "status", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     total = Column(Float, nullable=False)
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -98,7 +144,7 @@ class OrderItem(Base):
     __tablename__ = "order_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)  # Preço no momento da compra
@@ -108,6 +154,42 @@ class OrderItem(Base):
     product = relationship("Product", back_populates="order_items")
 
 
+class ArchivedOrder(Base):
+    """Pedido finalizado/cancelado movido para o arquivo (mantém o ID original)"""
+    __tablename__ = "archived_orders"
+    __table_args__ = (
+        Index("ix_archived_orders_created_at_id", "created_at", "id"),
+    )
+    
+    # Identifica a origem na serialização (OrderResponse.archived)
+    archived = True
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    total = Column(Float, nullable=False)
+    status = Column(Enum(OrderStatus), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relacionamentos
+    items = relationship("ArchivedOrderItem", back_populates="order")
+
+
+class ArchivedOrderItem(Base):
+    """Item de pedido arquivado"""
+    __tablename__ = "archived_order_items"
+    
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("archived_orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    
+    # Relacionamentos
+    order = relationship("ArchivedOrder", back_populates="items")
+    product = relationship("Product")
+
+
 class Cart(Base):
     """Modelo de Carrinho"""
     __tablename__ = "cart"
@@ -120,3 +202,23 @@ class Cart(Base):
     # Relacionamentos
     user = relationship("User", back_populates="cart_items")
     product = relationship("Product", back_populates="cart_items")
+
+
+class DailySales(Base):
+    """Rollup de vendas por dia (mantido junto com a criação/cancelamento de pedidos)"""
+    __tablename__ = "daily_sales"
+    
+    day = Column(Date, primary_key=True)
+    orders_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+
+class DailyProductSales(Base):
+    """Rollup de unidades e receita por produto e dia"""
+    __tablename__ = "daily_product_sales"
+    
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    category = Column(String, index=True)  # Categoria no momento da venda
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
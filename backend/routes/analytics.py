@@ -0,0 +1,111 @@
+"""
+Rotas de relatórios de vendas (leem os rollups, não o histórico de pedidos)
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+
+from database import get_db
+from models import DailySales, DailyProductSales, Product
+from schemas import (
+    DailySalesResponse, ProductSalesResponse, CategorySalesResponse, MessageResponse
+)
+from utils.auth import CurrentUser, get_current_admin_user
+from utils.sales import rebuild_sales_rollups
+
+router = APIRouter(prefix="/api/analytics", tags=["Relatórios"])
+
+
+def _filter_days(query, column, date_from: Optional[date], date_to: Optional[date]):
+    """Aplica o intervalo de datas (inclusivo) ao rollup"""
+    if date_from is not None:
+        query = query.filter(column >= date_from)
+    if date_to is not None:
+        query = query.filter(column <= date_to)
+    return query
+
+
+@router.get("/sales/daily", response_model=List[DailySalesResponse])
+def get_daily_sales(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Receita e número de pedidos por dia (apenas admin)
+    """
+    query = _filter_days(db.query(DailySales), DailySales.day, date_from, date_to)
+    return query.order_by(DailySales.day).all()
+
+
+@router.get("/sales/products", response_model=List[ProductSalesResponse])
+def get_product_sales(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Unidades vendidas e receita por produto no período (apenas admin)
+    """
+    query = db.query(
+        DailyProductSales.product_id,
+        Product.name,
+        func.max(DailyProductSales.category),
+        func.sum(DailyProductSales.units).label("units"),
+        func.sum(DailyProductSales.revenue).label("revenue")
+    ).outerjoin(Product, Product.id == DailyProductSales.product_id)
+    query = _filter_days(query, DailyProductSales.day, date_from, date_to)
+    rows = query.group_by(
+        DailyProductSales.product_id, Product.name
+    ).order_by(func.sum(DailyProductSales.revenue).desc()).limit(limit).all()
+
+    return [
+        {"product_id": pid, "name": name, "category": category, "units": units, "revenue": revenue}
+        for pid, name, category, units, revenue in rows
+    ]
+
+
+@router.get("/sales/categories", response_model=List[CategorySalesResponse])
+def get_category_sales(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Unidades vendidas e receita por categoria no período (apenas admin)
+    """
+    query = db.query(
+        DailyProductSales.category,
+        func.sum(DailyProductSales.units),
+        func.sum(DailyProductSales.revenue)
+    )
+    query = _filter_days(query, DailyProductSales.day, date_from, date_to)
+    rows = query.group_by(DailyProductSales.category).order_by(
+        func.sum(DailyProductSales.revenue).desc()
+    ).all()
+
+    return [
+        {"category": category, "units": units, "revenue": revenue}
+        for category, units, revenue in rows
+    ]
+
+
+@router.post("/rebuild", response_model=MessageResponse)
+def rebuild_rollups(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Recalcula os rollups a partir do histórico de pedidos (apenas admin)
+    """
+    days = rebuild_sales_rollups(db)
+    return {
+        "message": "Rollups de vendas recalculados",
+        "detail": f"{days} dia(s) processado(s)"
+    }
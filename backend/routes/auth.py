@@ -1,20 +1,34 @@
 """
 Rotas de autenticação (Login, Registro, Profile)
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from typing import Optional
 
 from database import get_db
 from models import User, UserRole
-from schemas import UserCreate, UserLogin, UserResponse, Token, UserUpdate, MessageResponse
+from schemas import (
+    UserCreate, UserLogin, UserResponse, Token, RefreshRequest, LogoutRequest,
+    UserUpdate, MessageResponse
+)
 from utils.auth import (
-    get_password_hash,
-    verify_password,
+    CurrentUser,
     create_access_token,
+    token_claims,
     get_current_user,
+    invalidate_user,
+    revoke_token,
+    optional_oauth2_scheme,
+    user_cache,
+    token_cache,
+    get_current_admin_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from utils.password_pool import password_pool
+from utils.refresh_tokens import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+from utils.revocation import revocation_filter
+from utils.rate_limit import check_login_rate, login_ip_limiter, login_email_limiter
 
 router = APIRouter(prefix="/api/auth", tags=["Autenticação"])
 
@@ -33,7 +47,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Cria novo usuário
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = password_pool.hash(user_data.password)
     new_user = User(
         name=user_data.name,
         email=user_data.email,
@@ -48,35 +62,95 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return new_user
 
 
+def _token_response(user: User, refresh_token: str) -> dict:
+    """Resposta com o access token (JWT de vida curta) e o refresh token"""
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data=token_claims(user), expires_delta=access_token_expires
+    )
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds())
+    }
+
+
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+def login(user_credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
     """
     Autentica usuário e retorna token JWT
     """
+    # Limite por IP e por email, antes de qualquer consulta ou bcrypt
+    check_login_rate(request, user_credentials.email)
+    
     # Busca usuário pelo email
     user = db.query(User).filter(User.email == user_credentials.email).first()
     
-    if not user or not verify_password(user_credentials.password, user.password):
+    if not user or not password_pool.verify(user_credentials.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Cria token JWT
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    refresh_token = issue_refresh_token(db, user.id)
+    db.commit()
+    
+    return _token_response(user, refresh_token)
+
+
+@router.post("/refresh", response_model=Token)
+def refresh(request_data: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Troca o refresh token por um novo par de tokens (o refresh token usado
+    deixa de valer)
+    """
+    user_id, refresh_token = rotate_refresh_token(db, request_data.refresh_token)
+    user = db.get(User, user_id)
+    if user is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    db.commit()
     
+    return _token_response(user, refresh_token)
+
+
+@router.get("/password-pool/stats")
+def get_password_pool_stats(current_user: CurrentUser = Depends(get_current_admin_user)):
+    """
+    Métricas do pool de hash de senha (apenas admin)
+    """
+    return password_pool.stats()
+
+
+@router.get("/login-limits/stats")
+def get_login_limit_stats(current_user: CurrentUser = Depends(get_current_admin_user)):
+    """
+    Estatísticas do limite de tentativas de login (apenas admin)
+    """
+    return {"ip": login_ip_limiter.stats(), "email": login_email_limiter.stats()}
+
+
+@router.get("/cache/stats")
+def get_auth_cache_stats(current_user: CurrentUser = Depends(get_current_admin_user)):
+    """
+    Estatísticas dos caches de autenticação (apenas admin)
+    """
     return {
-        "access_token": access_token,
-        "token_type": "bearer"
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "revocation": revocation_filter.stats()
     }
 
 
 @router.get("/profile", response_model=UserResponse)
-async def get_profile(current_user: User = Depends(get_current_user)):
+async def get_profile(current_user: CurrentUser = Depends(get_current_user)):
     """
     Retorna informações do usuário autenticado
     """
@@ -84,16 +158,18 @@ async def get_profile(current_user: User = Depends(get_current_user)):
 
 
 @router.put("/profile", response_model=UserResponse)
-async def update_profile(
+def update_profile(
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Atualiza informações do usuário autenticado
     """
+    user = db.get(User, current_user.id)
+    
     if user_data.name:
-        current_user.name = user_data.name
+        user.name = user_data.name
     
     if user_data.email:
         # Verifica se o novo email já está em uso
@@ -106,20 +182,43 @@ async def update_profile(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email já está em uso"
             )
-        current_user.email = user_data.email
+        user.email = user_data.email
     
     db.commit()
-    db.refresh(current_user)
+    db.refresh(user)
+    invalidate_user(user.id)
     
-    return current_user
+    return user
 
 
 @router.post("/logout", response_model=MessageResponse)
-async def logout(current_user: User = Depends(get_current_user)):
+def logout(
+    request_data: Optional[LogoutRequest] = None,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+):
     """
-    Logout (no JWT, o token é removido no frontend)
+    Logout: revoga o refresh token enviado (com todas as suas rotações) e o
+    access token atual. O access token é opcional: depois de alguns minutos
+    ocioso ele já expirou, mas a sessão ainda precisa ser encerrada.
     """
+    user_id = None
+    if request_data and request_data.refresh_token:
+        user_id = revoke_refresh_token(db, request_data.refresh_token)
+    
+    token_data = revoke_token(db, token) if token else None
+    if token_data is not None and user_id is None:
+        user_id = token_data.user_id
+    
+    if user_id is None and token_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não foi possível validar as credenciais",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user = db.get(User, user_id) if user_id is not None else None
     return {
         "message": "Logout realizado com sucesso",
-        "detail": f"Até logo, {current_user.name}!"
+        "detail": f"Até logo, {user.name}!" if user else "Até logo!"
     }
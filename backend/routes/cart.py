@@ -1,23 +1,51 @@
 """
 Rotas do carrinho de compras
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager
+from typing import List, Optional
 
 from database import get_db
-from models import Cart, Product, User, Order, OrderItem, OrderStatus
-from schemas import CartAdd, CartUpdate, CartItemResponse, CartResponse, MessageResponse
-from utils.auth import get_current_user
+from models import Cart, Product, Order, OrderItem, OrderStatus
+from schemas import (
+    CartAdd, CartUpdate, CartItemResponse, CartResponse, CartBatchUpdate,
+    CartOperationEnum, MessageResponse
+)
+from utils.auth import CurrentUser, get_current_user
+from utils.stock import reserve_stock, find_insufficient_stock
+from utils.idempotency import idempotency_store, IDEMPOTENCY_HEADER
+from utils.events import order_events
+from utils.sales import record_sale
+from routes.products import invalidate_catalog
+from routes.orders import load_order_response
 
 router = APIRouter(prefix="/api/cart", tags=["Carrinho"])
 
 
+def _load_cart(db: Session, user_id: int) -> dict:
+    """
+    Busca itens, produtos e total do carrinho em uma única consulta
+    (JOIN + SUM como window function)
+    """
+    rows = db.query(
+        Cart,
+        func.sum(Product.price * Cart.quantity).over()
+    ).join(Cart.product).options(
+        contains_eager(Cart.product)
+    ).filter(Cart.user_id == user_id).order_by(Cart.id).all()
+    
+    return {
+        "items": [item for item, _ in rows],
+        "total": rows[0][1] if rows else 0
+    }
+
+
 @router.get("/{user_id}", response_model=CartResponse)
 def get_cart(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Busca carrinho do usuário
@@ -29,22 +57,78 @@ def get_cart(
             detail="Você não tem permissão para acessar este carrinho"
         )
     
-    cart_items = db.query(Cart).filter(Cart.user_id == user_id).all()
+    return _load_cart(db, user_id)
+
+
+@router.patch("", response_model=CartResponse)
+def batch_update_cart(
+    batch: CartBatchUpdate,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Aplica várias operações (add/set/remove) no carrinho em uma única transação
+    e retorna o carrinho resultante
+    """
+    # Carrinho atual e produtos referenciados: uma consulta cada
+    cart_by_product = {
+        item.product_id: item
+        for item in db.query(Cart).filter(Cart.user_id == current_user.id).all()
+    }
+    product_ids = {op.product_id for op in batch.operations}
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(Product.id.in_(product_ids)).all()
+    }
     
-    # Calcula o total
-    total = sum(item.product.price * item.quantity for item in cart_items)
+    missing = product_ids - products.keys()
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Produto(s) não encontrado(s): {', '.join(map(str, sorted(missing)))}"
+        )
     
-    return {
-        "items": cart_items,
-        "total": total
-    }
+    # Aplica as operações em memória, na ordem recebida
+    quantities = {pid: item.quantity for pid, item in cart_by_product.items()}
+    for operation in batch.operations:
+        current = quantities.get(operation.product_id, 0)
+        if operation.op == CartOperationEnum.ADD:
+            quantities[operation.product_id] = current + operation.quantity
+        elif operation.op == CartOperationEnum.SET:
+            quantities[operation.product_id] = operation.quantity
+        else:
+            quantities[operation.product_id] = 0
+    
+    # Valida estoque apenas do resultado final
+    for product_id in product_ids:
+        product = products[product_id]
+        if quantities[product_id] > product.stock:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Estoque insuficiente para {product.name}. Disponível: {product.stock}"
+            )
+    
+    for product_id in sorted(product_ids):
+        quantity = quantities[product_id]
+        item = cart_by_product.get(product_id)
+        if quantity <= 0:
+            if item:
+                db.delete(item)
+        elif item:
+            item.quantity = quantity
+        else:
+            db.add(Cart(user_id=current_user.id, product_id=product_id, quantity=quantity))
+    
+    db.commit()
+    
+    return _load_cart(db, current_user.id)
 
 
 @router.post("/add", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
 def add_to_cart(
     cart_data: CartAdd,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Adiciona produto ao carrinho
@@ -97,7 +181,7 @@ def update_cart_item(
     item_id: int,
     update_data: CartUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Atualiza quantidade de item no carrinho
@@ -133,7 +217,7 @@ def update_cart_item(
 def remove_from_cart(
     item_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Remove item do carrinho
@@ -161,14 +245,27 @@ def remove_from_cart(
 
 @router.post("/checkout", response_model=MessageResponse)
 def checkout(
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
-    Finaliza compra convertendo carrinho em pedido
+    Finaliza compra convertendo carrinho em pedido.
+    Com o header Idempotency-Key, reenvios recebem a mesma resposta sem criar outro pedido.
     """
-    # Busca itens do carrinho
-    cart_items = db.query(Cart).filter(Cart.user_id == current_user.id).all()
+    return idempotency_store.run(
+        ("checkout", current_user.id), idempotency_key, "", response,
+        lambda: _checkout(db, current_user)
+    )
+
+
+def _checkout(db: Session, current_user: CurrentUser) -> dict:
+    """Converte o carrinho do usuário em pedido"""
+    # Busca itens do carrinho (com produtos na mesma consulta)
+    cart_items = db.query(Cart).join(Cart.product).options(
+        contains_eager(Cart.product)
+    ).filter(Cart.user_id == current_user.id).all()
     
     if not cart_items:
         raise HTTPException(
@@ -176,7 +273,7 @@ def checkout(
             detail="Carrinho vazio"
         )
     
-    # Valida estoque de todos os itens
+    # Validação rápida de estoque (a garantia real é a baixa atômica abaixo)
     for item in cart_items:
         if item.product.stock < item.quantity:
             raise HTTPException(
@@ -194,7 +291,8 @@ def checkout(
     db.add(new_order)
     db.flush()  # Garante que o order.id esteja disponível
     
-    # Cria itens do pedido e atualiza estoque
+    # Cria itens do pedido
+    quantities = {}
     for item in cart_items:
         order_item = OrderItem(
             order_id=new_order.id,
@@ -203,17 +301,35 @@ def checkout(
             price=item.product.price
         )
         db.add(order_item)
-        
-        # Atualiza estoque
-        item.product.stock -= item.quantity
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
     
     # Limpa carrinho
     for item in cart_items:
         db.delete(item)
+    db.flush()
+    
+    # Baixa de estoque atômica perto do fim, para segurar os locks pelo menor tempo
+    if not reserve_stock(db, quantities):
+        db.rollback()
+        product = find_insufficient_stock(db, quantities)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Estoque insuficiente para {product.name if product else 'um dos produtos'}"
+        )
+    
+    # Rollups de vendas na mesma transação, depois do estoque: todas as
+    # transações pegam os locks na mesma ordem (produtos, dia, produto do dia)
+    record_sale(db, new_order.created_at.date(), [
+        (item.product_id, item.product.category, item.quantity, item.product.price)
+        for item in cart_items
+    ])
     
+    order_id = new_order.id
     db.commit()
+    invalidate_catalog()  # Estoque dos produtos mudou
+    order_events.publish("order_created", load_order_response(db, order_id))
     
     return {
         "message": "Pedido realizado com sucesso!",
-        "detail": f"Pedido #{new_order.id} - Total: R$ {total:.2f}"
+        "detail": f"Pedido #{order_id} - Total: R$ {total:.2f}"
     }
@@ -1,35 +1,183 @@
 """
 Rotas de pedidos
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, insert, or_, update
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from datetime import datetime
 
 from database import get_db
-from models import Order, OrderItem, Product, User
-from schemas import OrderCreate, OrderResponse, OrderStatusUpdate, MessageResponse
-from utils.auth import get_current_user, get_current_admin_user
+from models import Order, OrderItem, OrderStatus, ArchivedOrder, ArchivedOrderItem, Product
+from schemas import (
+    OrderCreate, OrderResponse, OrderStatusUpdate, OrderStatusEnum,
+    OrderBulkStatusUpdate, OrderBulkStatusResult, MessageResponse
+)
+from utils.auth import CurrentUser, get_current_user, get_current_admin_user
+from utils.stock import reserve_stock, find_insufficient_stock
+from utils.idempotency import idempotency_store, IDEMPOTENCY_HEADER
+from utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from utils.events import order_events, format_sse
+from utils.sales import record_sale, record_order, record_orders
+from utils.order_export import stream_orders
+from utils.archive import archive_orders, ARCHIVE_AFTER_DAYS
+from routes.products import invalidate_catalog
 
 router = APIRouter(prefix="/api/orders", tags=["Pedidos"])
 
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Transições permitidas na atualização em massa (concluído/cancelado são finais)
+ALLOWED_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.PROCESSING, OrderStatus.COMPLETED, OrderStatus.CANCELLED},
+    OrderStatus.PROCESSING: {OrderStatus.COMPLETED, OrderStatus.CANCELLED},
+    OrderStatus.COMPLETED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+
+# Intervalo do comentário de keep-alive no feed SSE (segundos)
+SSE_KEEPALIVE = 15
+
+
+def load_order_response(db: Session, order_id: int) -> dict:
+    """Carrega o pedido com itens e produtos (em lote) já serializado"""
+    order = db.query(Order).options(
+        selectinload(Order.items).selectinload(OrderItem.product)
+    ).filter(Order.id == order_id).one()
+    return OrderResponse.model_validate(order).model_dump(mode="json")
+
+
+def load_order_responses(db: Session, order_ids: List[int]) -> List[dict]:
+    """Como load_order_response, para vários pedidos (mesmo número de consultas)"""
+    orders = db.query(Order).options(
+        selectinload(Order.items).selectinload(OrderItem.product)
+    ).filter(Order.id.in_(order_ids)).order_by(Order.id).all()
+    return [OrderResponse.model_validate(order).model_dump(mode="json") for order in orders]
+
+
+def _orders_page(
+    db: Session,
+    order_model,
+    item_model,
+    user_id: Optional[int],
+    order_status: Optional[OrderStatusEnum],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    after: Optional[tuple],
+    limit: int
+) -> list:
+    """Consulta paginada em uma tabela de pedidos (quente ou arquivo)"""
+    query = db.query(order_model).options(
+        selectinload(order_model.items).selectinload(item_model.product)
+    )
+    
+    if user_id is not None:
+        query = query.filter(order_model.user_id == user_id)
+    if order_status is not None:
+        query = query.filter(order_model.status == OrderStatus(order_status.value))
+    if date_from is not None:
+        query = query.filter(order_model.created_at >= date_from)
+    if date_to is not None:
+        query = query.filter(order_model.created_at < date_to)
+    if after is not None:
+        created_at, order_id = after
+        query = query.filter(or_(
+            order_model.created_at < created_at,
+            and_(order_model.created_at == created_at, order_model.id < order_id)
+        ))
+    
+    return query.order_by(
+        order_model.created_at.desc(), order_model.id.desc()
+    ).limit(limit).all()
+
+
+def list_orders(
+    db: Session,
+    response: Response,
+    user_id: Optional[int] = None,
+    order_status: Optional[OrderStatusEnum] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    include_archived: bool = False
+) -> list:
+    """
+    Busca uma página de pedidos (mais recentes primeiro) com paginação por
+    cursor em (created_at, id). Itens e produtos são carregados em lote:
+    3 consultas por tabela, independente do tamanho da página.
+    Com include_archived, a página intercala pedidos quentes e arquivados.
+    """
+    after = None
+    if cursor:
+        created_at, order_id = decode_cursor(cursor, 2)
+        try:
+            after = (datetime.fromisoformat(created_at), int(order_id))
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginação inválido"
+            )
+    
+    # Busca um item a mais para saber se existe próxima página
+    filters = (user_id, order_status, date_from, date_to, after, limit + 1)
+    orders = _orders_page(db, Order, OrderItem, *filters)
+    if include_archived:
+        orders += _orders_page(db, ArchivedOrder, ArchivedOrderItem, *filters)
+        orders.sort(key=lambda order: (order.created_at, order.id), reverse=True)
+    
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at.isoformat(), last.id)
+    
+    return orders
+
+
 @router.get("", response_model=List[OrderResponse])
 def get_all_orders(
+    response: Response,
+    user_id: Optional[int] = None,
+    order_status: Optional[OrderStatusEnum] = Query(None, alias="status"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_archived: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
     """
-    Lista todos os pedidos (apenas admin)
+    Lista pedidos com filtros e paginação por cursor (apenas admin)
     """
-    orders = db.query(Order).all()
-    return orders
+    return list_orders(
+        db, response,
+        user_id=user_id,
+        order_status=order_status,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+        limit=limit,
+        include_archived=include_archived
+    )
 
 
 @router.get("/user/{user_id}", response_model=List[OrderResponse])
 def get_user_orders(
     user_id: int,
+    response: Response,
+    order_status: Optional[OrderStatusEnum] = Query(None, alias="status"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_archived: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Lista pedidos de um usuário específico
@@ -41,50 +189,150 @@ def get_user_orders(
             detail="Você não tem permissão para acessar estes pedidos"
         )
     
-    orders = db.query(Order).filter(Order.user_id == user_id).all()
-    return orders
+    return list_orders(
+        db, response,
+        user_id=user_id,
+        order_status=order_status,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+        limit=limit,
+        include_archived=include_archived
+    )
+
+
+@router.get("/export")
+def export_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    order_status: Optional[OrderStatusEnum] = Query(None, alias="status"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    include_archived: bool = False,
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Exporta pedidos e itens (uma linha por item) em CSV ou NDJSON, em streaming (apenas admin)
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"pedidos.{format}"
+    return StreamingResponse(
+        stream_orders(
+            format,
+            order_status=OrderStatus(order_status.value) if order_status else None,
+            date_from=date_from,
+            date_to=date_to,
+            include_archived=include_archived
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/events")
+async def order_events_stream(
+    request: Request,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Feed ao vivo de pedidos via Server-Sent Events (apenas admin).
+    Eventos: order_created, order_status_changed e resync (quando não é
+    possível retomar a partir do Last-Event-ID e a tela deve recarregar a lista).
+    """
+    # A sessão (a mesma usada na autenticação) não é usada no stream:
+    # devolve a conexão ao pool em vez de segurá-la enquanto a tela estiver aberta
+    db.close()
+    
+    queue, backlog = order_events.subscribe(last_event_id)
+
+    async def stream():
+        try:
+            for event in backlog:
+                yield format_sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield format_sse(event)
+        finally:
+            order_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order(
     order_data: OrderCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
-    Cria um novo pedido
+    Cria um novo pedido.
+    Com o header Idempotency-Key, reenvios recebem o mesmo pedido sem duplicá-lo.
     """
+    return idempotency_store.run(
+        ("create_order", current_user.id), idempotency_key,
+        order_data.model_dump_json(), response,
+        lambda: _create_order(db, current_user, order_data)
+    )
+
+
+def _create_order(db: Session, current_user: CurrentUser, order_data: OrderCreate) -> dict:
+    """Valida itens, baixa o estoque e grava o pedido"""
     if not order_data.items:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="O pedido deve conter pelo menos um item"
         )
     
-    # Valida todos os produtos e estoque
-    total = 0
-    validated_items = []
-    
+    # Agrupa linhas repetidas do mesmo produto
+    quantities = {}
     for item in order_data.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    
+    # Busca todos os produtos em uma única consulta (IN)
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(Product.id.in_(quantities.keys())).all()
+    }
+    
+    # Valida e calcula o total em memória
+    total = 0
+    order_items = []
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
         
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Produto com ID {item.product_id} não encontrado"
+                detail=f"Produto com ID {product_id} não encontrado"
             )
         
-        if product.stock < item.quantity:
+        if product.stock < quantity:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Estoque insuficiente para {product.name}. Disponível: {product.stock}"
             )
         
-        validated_items.append({
-            "product": product,
-            "quantity": item.quantity,
+        order_items.append({
+            "product_id": product_id,
+            "quantity": quantity,
             "price": product.price
         })
-        total += product.price * item.quantity
+        total += product.price * quantity
     
     # Cria o pedido
     new_order = Order(
@@ -93,24 +341,123 @@ def create_order(
     )
     db.add(new_order)
     db.flush()  # Garante que o order.id esteja disponível
+    order_id = new_order.id
     
-    # Cria os itens do pedido e atualiza estoque
-    for item_data in validated_items:
-        order_item = OrderItem(
-            order_id=new_order.id,
-            product_id=item_data["product"].id,
-            quantity=item_data["quantity"],
-            price=item_data["price"]
+    # Insere todos os itens em um único executemany
+    db.execute(
+        insert(OrderItem),
+        [{"order_id": order_id, **item} for item in order_items]
+    )
+    
+    # Baixa de estoque atômica (falha se outro pedido consumiu o estoque antes)
+    if not reserve_stock(db, quantities):
+        db.rollback()
+        product = find_insufficient_stock(db, quantities)
+        detail = (
+            f"Estoque insuficiente para {product.name}. Disponível: {product.stock}"
+            if product else "Estoque insuficiente"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
         )
-        db.add(order_item)
-        
-        # Atualiza estoque
-        item_data["product"].stock -= item_data["quantity"]
+    
+    # Rollups de vendas na mesma transação, depois do estoque: todas as
+    # transações pegam os locks na mesma ordem (produtos, dia, produto do dia)
+    record_sale(db, new_order.created_at.date(), [
+        (item["product_id"], products[item["product_id"]].category, item["quantity"], item["price"])
+        for item in order_items
+    ])
     
     db.commit()
-    db.refresh(new_order)
+    invalidate_catalog()  # Estoque dos produtos mudou
+    
+    # Recarrega pedido, itens e produtos em lote para a resposta
+    order = load_order_response(db, order_id)
+    order_events.publish("order_created", order)
+    
+    return order
+
+
+@router.post("/archive", response_model=MessageResponse)
+def archive_old_orders(
+    older_than_days: int = Query(ARCHIVE_AFTER_DAYS, ge=1),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Move pedidos concluídos/cancelados antigos para o arquivo (apenas admin)
+    """
+    archived = archive_orders(db, older_than_days=older_than_days)
+    return {
+        "message": "Arquivamento concluído",
+        "detail": f"{archived} pedido(s) com mais de {older_than_days} dia(s) arquivado(s)"
+    }
+
+
+@router.put("/status", response_model=List[OrderBulkStatusResult])
+def bulk_update_order_status(
+    bulk_data: OrderBulkStatusUpdate,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Atualiza o status de vários pedidos com um único UPDATE (apenas admin).
+    Retorna o resultado por ID e publica order_status_changed para cada
+    pedido atualizado.
+    """
+    target = OrderStatus(bulk_data.status.value)
+    order_ids = list(dict.fromkeys(bulk_data.order_ids))
     
-    return new_order
+    current = dict(
+        db.query(Order.id, Order.status).filter(Order.id.in_(order_ids)).all()
+    )
+    
+    results = {}
+    candidates = []
+    for order_id in order_ids:
+        order_status = current.get(order_id)
+        if order_status is None:
+            results[order_id] = ("not_found", None)
+        elif order_status == target:
+            results[order_id] = ("unchanged", order_status.value)
+        elif target not in ALLOWED_TRANSITIONS[order_status]:
+            results[order_id] = ("invalid_transition", order_status.value)
+        else:
+            candidates.append(order_id)
+    
+    updated_ids = []
+    if candidates:
+        # O filtro por status de origem protege contra mudanças concorrentes
+        sources = [s for s, targets in ALLOWED_TRANSITIONS.items() if target in targets]
+        updated_ids = db.execute(
+            update(Order)
+            .where(Order.id.in_(candidates), Order.status.in_(sources))
+            .values(status=target)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        
+        if target == OrderStatus.CANCELLED:
+            record_orders(db, updated_ids, sign=-1)
+        db.commit()
+    
+    for order_id in candidates:
+        if order_id in updated_ids:
+            results[order_id] = ("updated", target.value)
+        else:
+            results[order_id] = ("invalid_transition", None)
+    
+    # Um order_status_changed por pedido, com o pedido completo (como na
+    # atualização individual): o feed não tem um evento próprio para lotes
+    if updated_ids:
+        for order_data in load_order_responses(db, updated_ids):
+            order_events.publish("order_status_changed", order_data)
+    
+    return [
+        {"id": order_id, "result": results[order_id][0], "status": results[order_id][1]}
+        for order_id in order_ids
+    ]
 
 
 @router.put("/{order_id}/status", response_model=OrderResponse)
@@ -118,7 +465,7 @@ def update_order_status(
     order_id: int,
     status_data: OrderStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
     """
     Atualiza status de um pedido (apenas admin)
@@ -131,8 +478,18 @@ def update_order_status(
             detail=f"Pedido com ID {order_id} não encontrado"
         )
     
+    # Cancelamento retira o pedido dos rollups; reabertura devolve
+    was_cancelled = order.status == OrderStatus.CANCELLED
+    will_be_cancelled = status_data.status == OrderStatusEnum.CANCELLED
+    if will_be_cancelled and not was_cancelled:
+        record_order(db, order_id, sign=-1)
+    elif was_cancelled and not will_be_cancelled:
+        record_order(db, order_id, sign=1)
+    
     order.status = status_data.status
     db.commit()
-    db.refresh(order)
     
-    return order
+    order_data = load_order_response(db, order_id)
+    order_events.publish("order_status_changed", order_data)
+    
+    return order_data
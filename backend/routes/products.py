@@ -1,25 +1,285 @@
 """
 Rotas de produtos (CRUD completo)
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+import csv
+import gzip
+import hashlib
+import json
+import threading
+from fastapi import (
+    APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+)
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from database import get_db
-from models import Product, User
-from schemas import ProductCreate, ProductUpdate, ProductResponse, MessageResponse
-from utils.auth import get_current_user, get_current_admin_user
+from models import Product
+from schemas import (
+    ProductCreate, ProductUpdate, ProductResponse, CategoryFacetResponse,
+    ProductImportResponse, MessageResponse
+)
+from utils.auth import CurrentUser, get_current_user, get_current_admin_user
+from utils.cache import TTLCache
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.search import search_product_ids
+from utils.product_import import import_products
 
 router = APIRouter(prefix="/api/products", tags=["Produtos"])
 
+# Paginação por cursor (keyset em Product.id)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Cache do catálogo (leituras públicas), invalidado pelas rotas de admin
+catalog_cache = TTLCache(
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "300"))
+)
+
+# Geração do catálogo: incrementada a cada invalidação. Leituras só gravam
+# no cache se nenhuma escrita aconteceu desde que começaram a consultar.
+_catalog_generation = 0
+_catalog_lock = threading.Lock()
+
+
+def catalog_generation() -> int:
+    """Geração atual (capturar antes de consultar o banco)"""
+    return _catalog_generation
+
+
+def cache_catalog(key, value, generation: int) -> None:
+    """Grava no cache apenas se o catálogo não mudou desde `generation`"""
+    with _catalog_lock:
+        if generation == _catalog_generation:
+            catalog_cache.set(key, value)
+
+
+# Respostas pequenas não compensam a compressão
+GZIP_MIN_SIZE = 1024
+
+
+class CatalogSnapshot:
+    """
+    Página do catálogo já renderizada em bytes JSON (e gzip), com ETag forte.
+    É gerada uma vez por escrita no catálogo e servida direto do cache.
+    """
+
+    def __init__(self, items: List[dict], next_cursor: Optional[int]):
+        self.next_cursor = next_cursor
+        self.body = json.dumps(
+            items, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # A versão gzip é outra representação, então recebe outra ETag forte
+        self.gzip_etag = f'"{digest}-gz"'
+        self.gzip_body = (
+            gzip.compress(self.body, compresslevel=6)
+            if len(self.body) >= GZIP_MIN_SIZE else None
+        )
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Verifica se o cliente já possui esta versão (If-None-Match)"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+    def to_response(self, request: Request) -> Response:
+        """Monta a resposta (200 ou 304) a partir dos bytes pré-renderizados"""
+        use_gzip = (
+            self.gzip_body is not None
+            and "gzip" in request.headers.get("accept-encoding", "")
+        )
+        headers = {
+            "ETag": self.gzip_etag if use_gzip else self.etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "no-cache"
+        }
+        if self.next_cursor is not None:
+            headers[NEXT_CURSOR_HEADER] = str(self.next_cursor)
+
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzip_body, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+def _serialize_product(product: Product) -> dict:
+    """Converte o produto em dict para guardar no cache"""
+    return ProductResponse.model_validate(product).model_dump()
+
+
+def invalidate_catalog(product: Optional[Product] = None) -> None:
+    """
+    Invalida o cache do catálogo após uma escrita.
+    Se o produto for informado, sua entrada individual já é regravada (write-through).
+    """
+    global _catalog_generation
+    data = _serialize_product(product) if product is not None else None
+    with _catalog_lock:
+        _catalog_generation += 1
+        catalog_cache.clear()
+        if data is not None:
+            catalog_cache.set(("product", product.id), data)
+
+
+def list_products(
+    db: Session,
+    request: Request,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: bool = False,
+    cursor: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> Response:
+    """
+    Busca uma página de produtos filtrados, ordenada por ID.
+    Se houver próxima página, o cursor é enviado no header X-Next-Cursor.
+    """
+    cache_key = ("list", category, min_price, max_price, in_stock, cursor, limit)
+    snapshot = catalog_cache.get(cache_key)
+    if snapshot is None:
+        generation = catalog_generation()
+        items, next_cursor = _query_products(
+            db, category, min_price, max_price, in_stock, cursor, limit
+        )
+        snapshot = CatalogSnapshot(items, next_cursor)
+        cache_catalog(cache_key, snapshot, generation)
+
+    return snapshot.to_response(request)
+
+
+def _query_products(
+    db: Session,
+    category: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    in_stock: bool,
+    cursor: Optional[int],
+    limit: int
+) -> tuple:
+    """Executa a consulta paginada e retorna (itens serializados, próximo cursor)"""
+    query = db.query(Product)
+
+    if category:
+        query = query.filter(Product.category == category)
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if in_stock:
+        query = query.filter(Product.stock > 0)
+    if cursor is not None:
+        query = query.filter(Product.id > cursor)
+
+    # Busca um item a mais para saber se existe próxima página
+    products = query.order_by(Product.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = products[-1].id
+
+    return [_serialize_product(p) for p in products], next_cursor
+
 
 @router.get("", response_model=List[ProductResponse])
-def get_all_products(db: Session = Depends(get_db)):
+def get_all_products(
+    request: Request,
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: bool = False,
+    cursor: Optional[int] = Query(None, ge=0, description="ID do último produto da página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """
+    Lista produtos com filtros e paginação por cursor (público)
+    """
+    return list_products(
+        db, request,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        cursor=cursor,
+        limit=limit
+    )
+
+
+@router.get("/search", response_model=List[ProductResponse])
+def search_products(
+    q: str = Query(..., min_length=1, max_length=100, description="Termos da busca"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Busca produtos por nome, descrição e categoria, ordenados por relevância (público)
     """
-    Lista todos os produtos (público)
+    cache_key = ("search", q.strip().lower(), limit)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    generation = catalog_generation()
+    product_ids = search_product_ids(db, q, limit)
+    products_by_id = {
+        p.id: p for p in db.query(Product).filter(Product.id.in_(product_ids)).all()
+    } if product_ids else {}
+
+    results = [
+        _serialize_product(products_by_id[pid])
+        for pid in product_ids if pid in products_by_id
+    ]
+    cache_catalog(cache_key, results, generation)
+    return results
+
+
+@router.get("/categories", response_model=List[CategoryFacetResponse])
+def get_categories(db: Session = Depends(get_db)):
+    """
+    Lista categorias com contagem de itens, itens em estoque e faixa de preço (público)
     """
-    products = db.query(Product).all()
-    return products
+    cached = catalog_cache.get(("categories",))
+    if cached is not None:
+        return cached
+
+    generation = catalog_generation()
+    rows = db.query(
+        Product.category,
+        func.count(Product.id),
+        func.sum(case((Product.stock > 0, 1), else_=0)),
+        func.min(Product.price),
+        func.max(Product.price)
+    ).group_by(Product.category).order_by(Product.category).all()
+
+    facets = [
+        {
+            "category": category,
+            "count": count,
+            "in_stock_count": in_stock_count or 0,
+            "min_price": min_price,
+            "max_price": max_price
+        }
+        for category, count, in_stock_count, min_price, max_price in rows
+    ]
+    cache_catalog(("categories",), facets, generation)
+    return facets
+
+
+@router.get("/cache/stats")
+def get_catalog_cache_stats(current_user: CurrentUser = Depends(get_current_admin_user)):
+    """
+    Estatísticas do cache do catálogo (apenas admin)
+    """
+    return catalog_cache.stats()
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
@@ -27,6 +287,11 @@ def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
     """
     Busca produto por ID (público)
     """
+    cached = catalog_cache.get(("product", product_id))
+    if cached is not None:
+        return cached
+
+    generation = catalog_generation()
     product = db.query(Product).filter(Product.id == product_id).first()
     
     if not product:
@@ -35,14 +300,16 @@ def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
             detail=f"Produto com ID {product_id} não encontrado"
         )
     
-    return product
+    data = _serialize_product(product)
+    cache_catalog(("product", product_id), data, generation)
+    return data
 
 
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 def create_product(
     product_data: ProductCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
     """
     Cria um novo produto (apenas admin)
@@ -52,16 +319,60 @@ def create_product(
     db.add(new_product)
     db.commit()
     db.refresh(new_product)
+    invalidate_catalog(new_product)
     
     return new_product
 
 
+@router.post("/import", response_model=ProductImportResponse)
+def import_products_file(
+    file: UploadFile = File(..., description="Arquivo .csv ou .ndjson"),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Importa/atualiza produtos em massa a partir de CSV ou NDJSON (apenas admin).
+    Linhas com `id` atualizam o produto; sem `id`, o produto é casado pelo nome.
+    """
+    fmt = format
+    if fmt is None:
+        filename = (file.filename or "").lower()
+        if filename.endswith(".csv"):
+            fmt = "csv"
+        elif filename.endswith((".ndjson", ".jsonl")):
+            fmt = "ndjson"
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Formato não reconhecido. Use format=csv ou format=ndjson"
+            )
+
+    try:
+        report = import_products(db, file.file, fmt)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O arquivo deve estar em UTF-8"
+        )
+    except csv.Error as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"CSV inválido: {exc}"
+        )
+
+    if report.inserted or report.updated:
+        invalidate_catalog()
+
+    return report.to_dict()
+
+
 @router.put("/{product_id}", response_model=ProductResponse)
 def update_product(
     product_id: int,
     product_data: ProductUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
     """
     Atualiza um produto existente (apenas admin)
@@ -81,6 +392,7 @@ def update_product(
     
     db.commit()
     db.refresh(product)
+    invalidate_catalog(product)
     
     return product
 
@@ -89,7 +401,7 @@ def update_product(
 def delete_product(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
     """
     Deleta um produto (apenas admin)
@@ -104,6 +416,7 @@ def delete_product(
     
     db.delete(product)
     db.commit()
+    invalidate_catalog()
     
     return {
         "message": "Produto deletado com sucesso",
@@ -1,36 +1,191 @@
 """
 Rotas de reservas
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from typing import List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
 
 from database import get_db
-from models import Reservation, User, ReservationStatus
-from schemas import ReservationCreate, ReservationUpdate, ReservationResponse, MessageResponse
-from utils.auth import get_current_user, get_current_admin_user
+from models import Reservation, ReservationStatus
+from schemas import (
+    ReservationCreate, ReservationUpdate, ReservationResponse,
+    ReservationAvailabilityResponse, ReservationStatusEnum, MessageResponse
+)
+from utils.auth import CurrentUser, get_current_user, get_current_admin_user
+from utils.reservation_index import available_slots, day_key, table_allocator, DEFAULT_DURATION
+from utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/api/reservations", tags=["Reservas"])
 
+# Maior intervalo aceito na consulta de disponibilidade
+MAX_AVAILABILITY_DAYS = 62
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _parse_start(day: str, time_of_day: str, check_past: bool = True) -> datetime:
+    """
+    Valida data (YYYY-MM-DD) e horário (HH:MM) e retorna o início da reserva.
+    O strptime aceita variações como "2027-1-6" e "9:5": date e time são
+    gravados a partir do resultado (ver _normalized), nunca da entrada crua.
+    """
+    try:
+        reservation_date = datetime.strptime(day, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato de data inválido. Use: YYYY-MM-DD"
+        )
+    if check_past and reservation_date < datetime.now().date():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Não é possível fazer reserva em data passada"
+        )
+    
+    try:
+        reservation_time = datetime.strptime(time_of_day, "%H:%M").time()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato de horário inválido. Use: HH:MM"
+        )
+    return datetime.combine(reservation_date, reservation_time)
+
+
+def _normalized(starts_at: datetime) -> Tuple[str, str]:
+    """Data e horário canônicos (YYYY-MM-DD, HH:MM) de um início de reserva"""
+    return starts_at.date().isoformat(), starts_at.strftime("%H:%M")
+
+
+def _check_group_size(db: Session, people_count: int) -> None:
+    """Recusa grupos maiores que a maior mesa"""
+    max_seats = table_allocator.max_seats(db)
+    if people_count > max_seats:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Não há mesa para {people_count} pessoas (máximo: {max_seats})"
+        )
+
+
+@router.get("/availability", response_model=List[ReservationAvailabilityResponse])
+def get_availability(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    people: int = Query(1, ge=1, le=20),
+    db: Session = Depends(get_db)
+):
+    """
+    Horários com mesa livre para o grupo, por dia no intervalo (público)
+    """
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A data final deve ser igual ou posterior à inicial"
+        )
+    if (date_to - date_from) > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O intervalo máximo é de {MAX_AVAILABILITY_DAYS} dias"
+        )
+    
+    return available_slots(db, date_from, date_to, people)
+
+
+def list_reservations(
+    db: Session,
+    response: Response,
+    user_id: Optional[int] = None,
+    reservation_status: Optional[ReservationStatusEnum] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> list:
+    """
+    Busca uma página de reservas em ordem cronológica com paginação por
+    cursor em (starts_at, id). O período filtra por starts_at e usa os
+    índices (starts_at, status) e (user_id, starts_at). Reservas antigas
+    com data/horário inválidos (starts_at nulo) não entram na listagem.
+    """
+    query = db.query(Reservation).filter(Reservation.starts_at.isnot(None))
+    
+    if user_id is not None:
+        query = query.filter(Reservation.user_id == user_id)
+    if reservation_status is not None:
+        query = query.filter(Reservation.status == ReservationStatus(reservation_status.value))
+    if date_from is not None:
+        query = query.filter(Reservation.starts_at >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        query = query.filter(
+            Reservation.starts_at < datetime.combine(date_to + timedelta(days=1), time.min)
+        )
+    if cursor:
+        starts_at, reservation_id = decode_cursor(cursor, 2)
+        try:
+            starts_at, reservation_id = datetime.fromisoformat(starts_at), int(reservation_id)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginação inválido"
+            )
+        query = query.filter(or_(
+            Reservation.starts_at > starts_at,
+            and_(Reservation.starts_at == starts_at, Reservation.id > reservation_id)
+        ))
+    
+    # Busca um item a mais para saber se existe próxima página
+    reservations = query.order_by(
+        Reservation.starts_at, Reservation.id
+    ).limit(limit + 1).all()
+    
+    if len(reservations) > limit:
+        reservations = reservations[:limit]
+        last = reservations[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.starts_at.isoformat(), last.id)
+    
+    return reservations
+
 
 @router.get("", response_model=List[ReservationResponse])
 def get_all_reservations(
+    response: Response,
+    user_id: Optional[int] = None,
+    reservation_status: Optional[ReservationStatusEnum] = Query(None, alias="status"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
     """
-    Lista todas as reservas (apenas admin)
+    Lista reservas com filtros e paginação por cursor (apenas admin)
     """
-    reservations = db.query(Reservation).all()
-    return reservations
+    return list_reservations(
+        db, response,
+        user_id=user_id,
+        reservation_status=reservation_status,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+        limit=limit
+    )
 
 
 @router.get("/user/{user_id}", response_model=List[ReservationResponse])
 def get_user_reservations(
     user_id: int,
+    response: Response,
+    reservation_status: Optional[ReservationStatusEnum] = Query(None, alias="status"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Lista reservas de um usuário específico
@@ -42,67 +197,60 @@ def get_user_reservations(
             detail="Você não tem permissão para acessar estas reservas"
         )
     
-    reservations = db.query(Reservation).filter(Reservation.user_id == user_id).all()
-    return reservations
+    return list_reservations(
+        db, response,
+        user_id=user_id,
+        reservation_status=reservation_status,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+        limit=limit
+    )
 
 
 @router.post("", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
 def create_reservation(
     reservation_data: ReservationCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Cria uma nova reserva
     """
-    # Validação básica de data (formato YYYY-MM-DD)
-    try:
-        reservation_date = datetime.strptime(reservation_data.date, "%Y-%m-%d")
-        if reservation_date.date() < datetime.now().date():
+    starts_at = _parse_start(reservation_data.date, reservation_data.time)
+    reservation_date, reservation_time = _normalized(starts_at)
+    _check_group_size(db, reservation_data.people_count)
+    duration = reservation_data.duration_minutes or DEFAULT_DURATION
+    
+    # Aloca a mesa e grava com o dia travado: reservas concorrentes no
+    # mesmo dia não recebem a mesma mesa
+    with table_allocator.lock(reservation_date):
+        table_id = table_allocator.find_table(
+            db, reservation_date, reservation_time,
+            reservation_data.people_count, duration
+        )
+        if table_id is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Não é possível fazer reserva em data passada"
+                detail="Não há mesa disponível para este horário e número de pessoas"
             )
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Formato de data inválido. Use: YYYY-MM-DD"
-        )
-    
-    # Validação básica de horário (formato HH:MM)
-    try:
-        datetime.strptime(reservation_data.time, "%H:%M")
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Formato de horário inválido. Use: HH:MM"
+        
+        # Cria nova reserva
+        new_reservation = Reservation(
+            user_id=current_user.id,
+            date=reservation_date,
+            time=reservation_time,
+            starts_at=starts_at,
+            people_count=reservation_data.people_count,
+            table_id=table_id,
+            duration_minutes=duration,
+            status=ReservationStatus.PENDING
         )
-    
-    # Verifica se já existe reserva no mesmo horário e data
-    existing_reservation = db.query(Reservation).filter(
-        Reservation.date == reservation_data.date,
-        Reservation.time == reservation_data.time,
-        Reservation.status != ReservationStatus.CANCELLED
-    ).first()
-    
-    if existing_reservation:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Já existe uma reserva para este horário"
-        )
-    
-    # Cria nova reserva
-    new_reservation = Reservation(
-        user_id=current_user.id,
-        date=reservation_data.date,
-        time=reservation_data.time,
-        people_count=reservation_data.people_count,
-        status=ReservationStatus.PENDING
-    )
-    
-    db.add(new_reservation)
-    db.commit()
-    db.refresh(new_reservation)
+        
+        db.add(new_reservation)
+        db.commit()
+        db.refresh(new_reservation)
+        table_allocator.add(new_reservation)
     
     return new_reservation
 
@@ -112,7 +260,7 @@ def update_reservation(
     reservation_id: int,
     reservation_data: ReservationUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Atualiza uma reserva existente
@@ -135,35 +283,58 @@ def update_reservation(
     # Atualiza apenas os campos fornecidos
     update_data = reservation_data.model_dump(exclude_unset=True)
     
-    # Validações se data ou hora forem atualizadas
-    if "date" in update_data:
-        try:
-            reservation_date = datetime.strptime(update_data["date"], "%Y-%m-%d")
-            if reservation_date.date() < datetime.now().date():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Não é possível fazer reserva em data passada"
-                )
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Formato de data inválido. Use: YYYY-MM-DD"
-            )
+    # Validações se data ou hora forem atualizadas (ou se a reserva é antiga,
+    # sem starts_at, e vai continuar ativa: precisa de data/hora válidas)
+    keeps_active = update_data.get("status", reservation.status) != ReservationStatus.CANCELLED
+    if "date" in update_data or "time" in update_data or (
+        reservation.starts_at is None and keeps_active
+    ):
+        starts_at = _parse_start(
+            update_data.get("date", reservation.date),
+            update_data.get("time", reservation.time),
+            check_past="date" in update_data
+        )
+        update_data["starts_at"] = starts_at
+        update_data["date"], update_data["time"] = _normalized(starts_at)
     
-    if "time" in update_data:
-        try:
-            datetime.strptime(update_data["time"], "%H:%M")
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Formato de horário inválido. Use: HH:MM"
-            )
+    if "people_count" in update_data:
+        _check_group_size(db, update_data["people_count"])
     
-    for key, value in update_data.items():
-        setattr(reservation, key, value)
+    old_date = day_key(reservation)
+    new_date = update_data["date"] if "starts_at" in update_data else old_date
     
-    db.commit()
-    db.refresh(reservation)
+    with table_allocator.lock(old_date, new_date):
+        # Carrega os dias antes de alterar o objeto: com autoflush desligado a
+        # consulta do índice devolveria a reserva já com a data nova, ainda
+        # não gravada, e o índice guardaria um intervalo que não existe
+        if reservation.starts_at is not None:
+            table_allocator.schedule(db, old_date)
+        table_allocator.schedule(db, new_date)
+        
+        for key, value in update_data.items():
+            setattr(reservation, key, value)
+        
+        if reservation.status != ReservationStatus.CANCELLED:
+            # Realoca ignorando o intervalo da própria reserva
+            reservation.duration_minutes = reservation.duration_minutes or DEFAULT_DURATION
+            table_id = table_allocator.find_table(
+                db, day_key(reservation), reservation.starts_at.strftime("%H:%M"),
+                reservation.people_count, reservation.duration_minutes, ignore=reservation.id
+            )
+            if table_id is None:
+                db.rollback()
+                # Por segurança o índice desses dias é recarregado do banco
+                table_allocator.forget(old_date, new_date)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Não há mesa disponível para este horário e número de pessoas"
+                )
+            reservation.table_id = table_id
+        
+        db.commit()
+        db.refresh(reservation)
+        table_allocator.release(old_date, reservation.id)
+        table_allocator.add(reservation)
     
     return reservation
 
@@ -172,7 +343,7 @@ def update_reservation(
 def cancel_reservation(
     reservation_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Cancela uma reserva
@@ -193,8 +364,11 @@ def cancel_reservation(
         )
     
     # Marca como cancelada ao invés de deletar
-    reservation.status = ReservationStatus.CANCELLED
-    db.commit()
+    reservation_day = day_key(reservation)
+    with table_allocator.lock(reservation_day):
+        reservation.status = ReservationStatus.CANCELLED
+        db.commit()
+        table_allocator.release(reservation_day, reservation.id)
     
     return {
         "message": "Reserva cancelada com sucesso",
@@ -3,7 +3,7 @@ Schemas Pydantic para validação de dados
 """
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -20,6 +20,12 @@ class OrderStatusEnum(str, Enum):
     CANCELLED = "cancelled"
 
 
+class CartOperationEnum(str, Enum):
+    ADD = "add"
+    SET = "set"
+    REMOVE = "remove"
+
+
 class ReservationStatusEnum(str, Enum):
     PENDING = "pending"
     CONFIRMED = "confirmed"
@@ -56,10 +62,24 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Validade do access token (segundos)
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
+    role: Optional[str] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
 
 
 # ===== PRODUCT SCHEMAS =====
@@ -92,6 +112,26 @@ class ProductResponse(ProductBase):
         from_attributes = True
 
 
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ProductImportResponse(BaseModel):
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[ImportRowError]
+
+
+class CategoryFacetResponse(BaseModel):
+    category: Optional[str] = None
+    count: int
+    in_stock_count: int
+    min_price: float
+    max_price: float
+
+
 # ===== CART SCHEMAS =====
 class CartAdd(BaseModel):
     product_id: int
@@ -102,6 +142,16 @@ class CartUpdate(BaseModel):
     quantity: int = Field(..., ge=1)
 
 
+class CartOperation(BaseModel):
+    op: CartOperationEnum
+    product_id: int
+    quantity: int = Field(default=1, ge=0)
+
+
+class CartBatchUpdate(BaseModel):
+    operations: List[CartOperation] = Field(..., min_length=1, max_length=100)
+
+
 class CartItemResponse(BaseModel):
     id: int
     product_id: int
@@ -122,12 +172,14 @@ class ReservationCreate(BaseModel):
     date: str = Field(..., description="Formato: YYYY-MM-DD")
     time: str = Field(..., description="Formato: HH:MM")
     people_count: int = Field(..., ge=1, le=20)
+    duration_minutes: Optional[int] = Field(None, ge=15, le=360)
 
 
 class ReservationUpdate(BaseModel):
     date: Optional[str] = None
     time: Optional[str] = None
     people_count: Optional[int] = Field(None, ge=1, le=20)
+    duration_minutes: Optional[int] = Field(None, ge=15, le=360)
     status: Optional[ReservationStatusEnum] = None
 
 
@@ -136,14 +188,22 @@ class ReservationResponse(BaseModel):
     user_id: int
     date: str
     time: str
+    starts_at: Optional[datetime] = None
     people_count: int
     status: str
+    table_id: Optional[int] = None
+    duration_minutes: Optional[int] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
 
+class ReservationAvailabilityResponse(BaseModel):
+    date: str
+    open_slots: List[str]
+
+
 # ===== ORDER SCHEMAS =====
 class OrderItemCreate(BaseModel):
     product_id: int
@@ -172,6 +232,7 @@ class OrderResponse(BaseModel):
     status: str
     created_at: datetime
     items: List[OrderItemResponse]
+    archived: bool = False
     
     class Config:
         from_attributes = True
@@ -181,6 +242,38 @@ class OrderStatusUpdate(BaseModel):
     status: OrderStatusEnum
 
 
+class OrderBulkStatusUpdate(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=500)
+    status: OrderStatusEnum
+
+
+class OrderBulkStatusResult(BaseModel):
+    id: int
+    result: str  # updated | unchanged | not_found | invalid_transition
+    status: Optional[str] = None
+
+
+# ===== ANALYTICS SCHEMAS =====
+class DailySalesResponse(BaseModel):
+    day: date
+    orders_count: int
+    revenue: float
+
+
+class ProductSalesResponse(BaseModel):
+    product_id: int
+    name: Optional[str] = None
+    category: Optional[str] = None
+    units: int
+    revenue: float
+
+
+class CategorySalesResponse(BaseModel):
+    category: Optional[str] = None
+    units: int
+    revenue: float
+
+
 # ===== GENERIC RESPONSE =====
 class MessageResponse(BaseModel):
     message: str
@@ -8,4 +8,6 @@ python simple_force_seed.py
 
 # Inicia o servidor
 echo "🌐 Iniciando servidor FastAPI..."
+# Em produção (Easypanel) a API fica atrás de um proxy reverso; sem proxy use 0
+export TRUSTED_PROXY_HOPS=${TRUSTED_PROXY_HOPS:-1}
 uvicorn app:app --host 0.0.0.0 --port ${PORT:-80}
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Fixtures dos testes: banco SQLite temporário, cliente HTTP e fábricas
+de usuários/produtos. Cada teste cria os próprios dados (emails e nomes
+únicos), então o banco é compartilhado pela sessão inteira.
+"""
+import itertools
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+# O banco local é ./cafeteria.db: roda os testes em um diretório temporário
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# Processos filhos do pool de senhas (forkserver) também importam do backend
+os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, os.getenv("PYTHONPATH")]))
+os.chdir(tempfile.mkdtemp(prefix="cafeteria-tests-"))
+os.environ.pop("DATABASE_URL", None)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import app
+from database import SessionLocal, engine, init_db
+from models import Product, User, UserRole
+from utils.auth import create_access_token, token_claims
+
+init_db()
+
+_sequence = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Cria um usuário e devolve (usuário, headers de autenticação)"""
+    def factory(role: UserRole = UserRole.USER):
+        n = next(_sequence)
+        user = User(name=f"Usuário {n}", email=f"user{n}@teste.com", password="x", role=role)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        headers = {"Authorization": f"Bearer {create_access_token(token_claims(user))}"}
+        return user, headers
+    return factory
+
+
+@pytest.fixture
+def make_products(db):
+    """Cria `count` produtos e devolve os ids"""
+    def factory(count: int, stock: int = 100, price: float = 10.0, category: str = "Testes"):
+        products = [
+            Product(name=f"Produto {next(_sequence)}", description="teste",
+                    price=price, category=category, stock=stock)
+            for _ in range(count)
+        ]
+        db.add_all(products)
+        db.commit()
+        return [product.id for product in products]
+    return factory
+
+
+@pytest.fixture
+def count_statements():
+    """Conta os comandos SQL executados dentro do bloco"""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+    return counter
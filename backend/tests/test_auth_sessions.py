@@ -0,0 +1,103 @@
+"""
+Sessões com refresh token: rotação, tolerância a renovações concorrentes,
+logout sem access token válido e revogações durante a reconstrução do
+filtro
+"""
+import threading
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from utils import refresh_tokens, revocation
+from utils.auth import create_access_token, token_claims
+from utils.refresh_tokens import issue_refresh_token
+
+
+def _session(db, make_user):
+    user, headers = make_user()
+    token = issue_refresh_token(db, user.id)
+    db.commit()
+    return user, headers, token
+
+
+def _refresh(client, token):
+    return client.post("/api/auth/refresh", json={"refresh_token": token})
+
+
+def test_rotation_issues_new_pair(client, db, make_user):
+    _, _, token = _session(db, make_user)
+
+    response = _refresh(client, token)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["access_token"] and body["refresh_token"] != token
+    assert _refresh(client, body["refresh_token"]).status_code == 200
+
+
+def test_concurrent_refresh_within_grace_window(client, db, make_user):
+    _, _, token = _session(db, make_user)
+
+    # Duas abas renovando com o mesmo token: as duas continuam logadas
+    first = _refresh(client, token)
+    second = _refresh(client, token)
+    assert (first.status_code, second.status_code) == (200, 200)
+    assert _refresh(client, first.json()["refresh_token"]).status_code == 200
+    assert _refresh(client, second.json()["refresh_token"]).status_code == 200
+
+
+def test_reuse_after_grace_window_revokes_family(client, db, make_user, monkeypatch):
+    monkeypatch.setattr(refresh_tokens, "REFRESH_TOKEN_REUSE_GRACE", 0)
+    _, _, token = _session(db, make_user)
+
+    rotated = _refresh(client, token).json()["refresh_token"]
+    assert _refresh(client, token).status_code == 401
+    assert _refresh(client, rotated).status_code == 401
+
+
+def test_logout_with_expired_access_token(client, db, make_user):
+    user, _, token = _session(db, make_user)
+    expired = create_access_token(token_claims(user), expires_delta=timedelta(minutes=-1))
+
+    response = client.post("/api/auth/logout", json={"refresh_token": token},
+                           headers={"Authorization": f"Bearer {expired}"})
+    assert response.status_code == 200
+    assert user.name in response.json()["detail"]
+    assert _refresh(client, token).status_code == 401
+
+
+def test_logout_revokes_rotated_tokens_within_grace(client, db, make_user):
+    _, headers, token = _session(db, make_user)
+    rotated = _refresh(client, token).json()["refresh_token"]
+
+    response = client.post("/api/auth/logout", json={"refresh_token": rotated}, headers=headers)
+    assert response.status_code == 200
+    # Família sem token ativo: reapresentar o token antigo não reabre a sessão
+    assert _refresh(client, token).status_code == 401
+    assert client.get("/api/auth/profile", headers=headers).status_code == 401
+
+
+def test_logout_requires_some_credential(client):
+    assert client.post("/api/auth/logout").status_code == 401
+    assert client.post("/api/auth/logout", json={"refresh_token": "desconhecido"}).status_code == 401
+
+
+def test_revoke_during_filter_rebuild_is_kept(db, monkeypatch):
+    revocations = revocation.RevocationFilter()
+    revocations.load(db)
+    expires_at = datetime.utcnow() + timedelta(minutes=15)
+
+    # Logout concorrente entre a leitura da tabela e a troca do filtro
+    def revoke_elsewhere():
+        with SessionLocal() as other:
+            revocations.revoke(other, "revogado-na-reconstrucao", expires_at)
+
+    class RacingBloomFilter(revocation.BloomFilter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            racer.start()
+            racer.join(timeout=0.2)
+
+    racer = threading.Thread(target=revoke_elsewhere)
+    monkeypatch.setattr(revocation, "BloomFilter", RacingBloomFilter)
+    revocations.load(db)
+    racer.join()
+    assert revocations.is_revoked(db, "revogado-na-reconstrucao")
@@ -0,0 +1,54 @@
+"""
+GET /api/cart/{user_id}: itens, produtos e total em uma única consulta,
+qualquer que seja o tamanho do carrinho
+"""
+from models import Cart
+
+
+def _fill_cart(db, user_id, product_ids):
+    db.add_all(Cart(user_id=user_id, product_id=pid, quantity=2) for pid in product_ids)
+    db.commit()
+
+
+def _cart_statements(client, count_statements, user_id, headers):
+    # Aquece o cache de usuários: só a leitura do carrinho é contada
+    assert client.get(f"/api/cart/{user_id}", headers=headers).status_code == 200
+    with count_statements() as statements:
+        response = client.get(f"/api/cart/{user_id}", headers=headers)
+    assert response.status_code == 200
+    return response.json(), statements
+
+
+def test_cart_load_is_one_query_for_one_item(client, db, make_user, make_products, count_statements):
+    user, headers = make_user()
+    _fill_cart(db, user.id, make_products(1, price=5.0))
+
+    cart, statements = _cart_statements(client, count_statements, user.id, headers)
+
+    assert len(cart["items"]) == 1
+    assert cart["total"] == 10.0
+    assert len(statements) == 1
+
+
+def test_cart_load_does_not_grow_with_items(client, db, make_user, make_products, count_statements):
+    small_user, small_headers = make_user()
+    _fill_cart(db, small_user.id, make_products(1))
+    big_user, big_headers = make_user()
+    _fill_cart(db, big_user.id, make_products(25, price=4.0))
+
+    _, small = _cart_statements(client, count_statements, small_user.id, small_headers)
+    cart, big = _cart_statements(client, count_statements, big_user.id, big_headers)
+
+    assert len(cart["items"]) == 25
+    assert cart["total"] == 25 * 2 * 4.0
+    assert all(item["product"]["price"] == 4.0 for item in cart["items"])
+    assert len(big) == len(small) == 1
+
+
+def test_empty_cart(client, make_user, count_statements):
+    user, headers = make_user()
+
+    cart, statements = _cart_statements(client, count_statements, user.id, headers)
+
+    assert cart == {"items": [], "total": 0}
+    assert len(statements) == 1
@@ -0,0 +1,64 @@
+"""
+Checkouts simultâneos em um produto disputado: a baixa atômica de estoque
+não pode vender além do disponível nem derrubar requisições com 5xx
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app import app
+from models import Cart, Order, OrderItem, Product
+
+STOCK = 50
+BUYERS = 300
+THREADS = 64
+
+
+def _buyers(make_user, count):
+    return [make_user() for _ in range(count)]
+
+
+def _run_concurrently(send, headers):
+    with ThreadPoolExecutor(THREADS) as executor:
+        return Counter(executor.map(send, headers))
+
+
+def test_concurrent_orders_do_not_oversell(db, make_user, make_products):
+    product_id, = make_products(1, stock=STOCK)
+    headers = [h for _, h in _buyers(make_user, BUYERS)]
+    body = {"items": [{"product_id": product_id, "quantity": 1}]}
+
+    # Um único event loop para todas as requisições, como no uvicorn
+    with TestClient(app) as client:
+        codes = _run_concurrently(
+            lambda h: client.post("/api/orders", json=body, headers=h).status_code,
+            headers
+        )
+
+    assert codes == {201: STOCK, 400: BUYERS - STOCK}
+    db.expire_all()
+    assert db.get(Product, product_id).stock == 0
+    sold = db.query(OrderItem).filter(OrderItem.product_id == product_id).count()
+    assert sold == STOCK
+
+
+def test_concurrent_checkouts_do_not_oversell(db, make_user, make_products):
+    product_id, = make_products(1, stock=STOCK)
+    buyers = _buyers(make_user, BUYERS)
+    db.add_all(Cart(user_id=user.id, product_id=product_id, quantity=1) for user, _ in buyers)
+    db.commit()
+
+    with TestClient(app) as client:
+        codes = _run_concurrently(
+            lambda h: client.post("/api/cart/checkout", headers=h).status_code,
+            [h for _, h in buyers]
+        )
+
+    assert codes == {200: STOCK, 400: BUYERS - STOCK}
+    db.expire_all()
+    assert db.get(Product, product_id).stock == 0
+    user_ids = [user.id for user, _ in buyers]
+    assert db.query(Order).filter(Order.user_id.in_(user_ids)).count() == STOCK
+    # Quem não conseguiu comprar mantém o carrinho
+    assert db.query(Cart).filter(Cart.user_id.in_(user_ids)).count() == BUYERS - STOCK
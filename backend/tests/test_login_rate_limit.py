@@ -0,0 +1,50 @@
+"""
+Limite de tentativas de login: chave por IP atrás de proxy reverso
+"""
+import pytest
+from starlette.requests import Request
+
+from utils import rate_limit
+from utils.rate_limit import TokenBucketLimiter, client_ip
+
+
+def _request(peer: str, *forwarded_for: str) -> Request:
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded_for]
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+@pytest.mark.parametrize("hops, forwarded, expected", [
+    (0, ["203.0.113.9"], "10.0.0.2"),                       # sem proxy: header ignorado
+    (1, ["203.0.113.9"], "203.0.113.9"),
+    (1, ["1.1.1.1, 203.0.113.9"], "203.0.113.9"),           # começo forjado pelo cliente
+    (1, ["1.1.1.1", "203.0.113.9"], "203.0.113.9"),         # headers repetidos
+    (2, ["1.1.1.1, 203.0.113.9, 10.0.0.7"], "203.0.113.9"),
+    (2, ["203.0.113.9"], "10.0.0.2"),                       # menos entradas que proxies
+    (1, [], "10.0.0.2"),
+])
+def test_client_ip(monkeypatch, hops, forwarded, expected):
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXY_HOPS", hops)
+    assert client_ip(_request("10.0.0.2", *forwarded)) == expected
+
+
+def test_forged_forwarded_for_does_not_escape_the_ip_bucket(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXY_HOPS", 1)
+    monkeypatch.setattr(rate_limit, "login_ip_limiter", TokenBucketLimiter(rate_per_minute=1, burst=3))
+
+    codes = [
+        client.post(
+            "/api/auth/login",
+            json={"email": f"ninguem{n}@teste.com", "password": "errada"},
+            headers={"X-Forwarded-For": f"198.51.100.{n}, 203.0.113.9"}
+        ).status_code
+        for n in range(5)
+    ]
+    assert codes == [401, 401, 401, 429, 429]
+
+    # Outro cliente atrás do mesmo proxy tem o seu próprio balde
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "ninguem@teste.com", "password": "errada"},
+        headers={"X-Forwarded-For": "203.0.113.10"}
+    )
+    assert response.status_code == 401
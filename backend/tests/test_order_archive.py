@@ -0,0 +1,48 @@
+"""
+Arquivamento de pedidos: o ID de um pedido arquivado nunca volta a ser
+usado por um pedido novo (o SQLite reaproveita max(id) + 1)
+"""
+from models import ArchivedOrder, Order, OrderStatus
+from utils.archive import archive_orders
+
+
+def _place_completed_order(client, db, headers, product_id):
+    response = client.post("/api/orders", headers=headers,
+                           json={"items": [{"product_id": product_id, "quantity": 1}]})
+    assert response.status_code == 201
+    order = db.get(Order, response.json()["id"])
+    # Só o status muda: a data fica como está para não mexer nos rollups
+    order.status = OrderStatus.COMPLETED
+    db.commit()
+    return order.id
+
+
+def test_archived_ids_are_not_reused(client, db, make_user, make_products):
+    _, headers = make_user()
+    product_id = make_products(1, stock=100)[0]
+
+    first = _place_completed_order(client, db, headers, product_id)
+    # O pedido de maior ID fica nas tabelas quentes
+    archive_orders(db, older_than_days=0)
+    assert db.get(ArchivedOrder, first) is None
+
+    second = _place_completed_order(client, db, headers, product_id)
+    archive_orders(db, older_than_days=0)
+    db.expire_all()
+    assert db.get(ArchivedOrder, first) is not None
+    assert db.get(Order, second) is not None
+
+    third = _place_completed_order(client, db, headers, product_id)
+    assert third not in (first, second)
+
+    # Arquivar de novo não esbarra em IDs repetidos
+    archive_orders(db, older_than_days=0)
+    db.expire_all()
+    assert db.get(ArchivedOrder, second) is not None
+
+    response = client.get("/api/orders/user/{}?include_archived=true&limit=200".format(
+        db.get(Order, third).user_id), headers=headers)
+    assert response.status_code == 200
+    ids = [order["id"] for order in response.json()]
+    assert len(ids) == len(set(ids))
+    assert {first, second, third} <= set(ids)
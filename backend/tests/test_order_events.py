@@ -0,0 +1,41 @@
+"""
+Feed de pedidos: a atualização em massa publica o mesmo evento da
+atualização individual (order_status_changed com o pedido completo)
+"""
+import asyncio
+
+from models import UserRole
+from utils.events import order_events
+
+
+def _events_since(last_event_id):
+    async def backlog():
+        queue, events = order_events.subscribe(last_event_id)
+        order_events.unsubscribe(queue)
+        return events
+    return asyncio.run(backlog())
+
+
+def test_bulk_update_publishes_order_status_changed(client, make_user, make_products):
+    _, admin = make_user(UserRole.ADMIN)
+    _, headers = make_user()
+    product_id, = make_products(1)
+
+    order_ids = []
+    for _ in range(3):
+        response = client.post("/api/orders", headers=headers,
+                               json={"items": [{"product_id": product_id, "quantity": 1}]})
+        assert response.status_code == 201
+        order_ids.append(response.json()["id"])
+
+    last_event_id = order_events.publish("test_marker", {})
+    response = client.put("/api/orders/status", headers=admin,
+                          json={"order_ids": order_ids, "status": "completed"})
+    assert response.status_code == 200
+
+    events = _events_since(last_event_id)
+    assert [event_type for _, event_type, _ in events] == ["order_status_changed"] * 3
+    assert [data["id"] for _, _, data in events] == order_ids
+    for _, _, data in events:
+        assert data["status"] == "completed"
+        assert [item["product_id"] for item in data["items"]] == [product_id]
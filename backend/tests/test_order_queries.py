@@ -0,0 +1,54 @@
+"""
+POST /api/orders: número de comandos SQL constante, qualquer que seja
+o número de linhas do pedido
+"""
+import time
+
+import pytest
+
+LINE_COUNTS = (1, 10, 50, 100)
+
+
+@pytest.fixture
+def order_statements(client, make_user, make_products, count_statements):
+    user, headers = make_user()
+    product_ids = make_products(max(LINE_COUNTS), stock=1000)
+    # Aquece o cache de usuários e o filtro de revogação
+    assert client.get("/api/auth/profile", headers=headers).status_code == 200
+
+    def place(lines: int):
+        body = {"items": [{"product_id": pid, "quantity": 1} for pid in product_ids[:lines]]}
+        started = time.perf_counter()
+        with count_statements() as statements:
+            response = client.post("/api/orders", json=body, headers=headers)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        assert response.status_code == 201
+        assert len(response.json()["items"]) == lines
+        return statements, elapsed_ms
+    return place
+
+
+def test_order_statement_count_is_constant(order_statements):
+    counts = {}
+    for lines in LINE_COUNTS:
+        statements, elapsed_ms = order_statements(lines)
+        counts[lines] = len(statements)
+        print(f"{lines:>3} linhas: {len(statements)} comandos, {elapsed_ms:.1f} ms")
+
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_repeated_product_lines_are_merged(client, make_user, make_products, db):
+    _, headers = make_user()
+    product_id, = make_products(1, stock=10, price=3.0)
+    body = {"items": [{"product_id": product_id, "quantity": 4}] * 3}
+
+    response = client.post("/api/orders", json=body, headers=headers)
+    assert response.status_code == 400  # 12 unidades pedidas, 10 em estoque
+
+    body["items"] = body["items"][:2]
+    response = client.post("/api/orders", json=body, headers=headers)
+    assert response.status_code == 201
+    order = response.json()
+    assert [(item["product_id"], item["quantity"]) for item in order["items"]] == [(product_id, 8)]
+    assert order["total"] == 24.0
@@ -0,0 +1,75 @@
+"""
+Pool de processos do bcrypt: execução nos filhos, fila limitada e
+liberação do lugar na fila só quando a tarefa termina
+"""
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from utils import password_pool as pool_module
+from utils.auth import verify_password
+from utils.password_pool import PasswordPool
+
+
+@pytest.fixture
+def pool():
+    pool = PasswordPool(workers=1, max_pending=2)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_hash_and_verify(pool):
+    hashed = pool.hash("segredo1")
+    assert verify_password("segredo1", hashed)
+    assert pool.verify("segredo1", hashed) is True
+    assert pool.verify("errada", hashed) is False
+    assert pool.stats()["completed"] == 3
+    assert pool.stats()["pending"] == 0
+
+
+def test_timed_out_task_keeps_its_slot_until_done(pool, monkeypatch):
+    monkeypatch.setattr(pool_module, "POOL_TIMEOUT", 0.1)
+
+    with pytest.raises(HTTPException) as exc:
+        pool.run(time.sleep, 0.6)
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"]
+
+    # A tarefa continua executando no filho: o lugar segue ocupado
+    stats = pool.stats()
+    assert (stats["pending"], stats["failed"]) == (1, 1)
+
+    _wait_for(lambda: pool.stats()["pending"] == 0)
+
+
+def test_queued_task_is_cancelled_on_timeout(pool, monkeypatch):
+    monkeypatch.setattr(pool_module, "POOL_TIMEOUT", 0.1)
+    running = pool._get_executor().submit(time.sleep, 0.6)
+
+    # Fica na fila atrás da tarefa acima e é cancelada sem executar
+    with pytest.raises(HTTPException):
+        pool.run(time.sleep, 0.6)
+    running.result()
+    _wait_for(lambda: pool.stats()["pending"] == 0)
+
+
+def test_full_queue_is_rejected(pool, monkeypatch):
+    monkeypatch.setattr(pool_module, "POOL_TIMEOUT", 0.05)
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            pool.run(time.sleep, 0.5)
+
+    with pytest.raises(HTTPException) as exc:
+        pool.verify("x", "y")
+    assert exc.value.status_code == 503
+    assert pool.stats()["rejected"] == 1
+    _wait_for(lambda: pool.stats()["pending"] == 0)
@@ -0,0 +1,157 @@
+"""
+Alocação de mesas: datas normalizadas, reservas antigas sem mesa,
+reservas concorrentes no mesmo horário e consulta de uma temporada
+"""
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app import app
+from models import Reservation, ReservationStatus
+from utils.reservation_index import slot_grid, table_allocator
+
+# Cada teste usa dias próprios, ainda não carregados no índice
+_days = (date(2031, 1, 1) + timedelta(days=n) for n in itertools.count())
+
+
+def _book(client, headers, day, time_of_day, people=2):
+    return client.post("/api/reservations", headers=headers, json={
+        "date": day, "time": time_of_day, "people_count": people
+    })
+
+
+def _tables_for(db, people):
+    return [table_id for seats, table_id in table_allocator.tables(db) if seats >= people]
+
+
+def test_dates_are_normalized(client, db, make_user):
+    _, headers = make_user()
+    day = next(_days)
+    loose = f"{day.year}-{day.month}-{day.day}"
+    assert loose != day.isoformat()
+
+    response = _book(client, headers, loose, "9:5")
+    assert response.status_code == 201
+    reservation = response.json()
+    assert (reservation["date"], reservation["time"]) == (day.isoformat(), "09:05")
+
+    # A mesma mesa não pode ser dada de novo pela grafia canônica do dia
+    booked = {reservation["table_id"]}
+    for _ in _tables_for(db, 2)[1:]:
+        response = _book(client, headers, day.isoformat(), "09:05")
+        assert response.status_code == 201
+        booked.add(response.json()["table_id"])
+    assert booked == set(_tables_for(db, 2))
+    assert _book(client, headers, loose, "09:05").status_code == 400
+
+    # Edição também grava a forma canônica e continua no mesmo dia
+    response = client.put(f"/api/reservations/{reservation['id']}", headers=headers,
+                          json={"time": "9:30"})
+    assert response.status_code == 200
+    assert (response.json()["date"], response.json()["time"]) == (day.isoformat(), "09:30")
+
+
+def test_legacy_rows_do_not_take_assigned_tables(client, db, make_user):
+    user, headers = make_user()
+    day = next(_days)
+    starts_at = datetime.combine(day, datetime.strptime("19:00", "%H:%M").time())
+    smallest = _tables_for(db, 2)[0]
+
+    # Reserva antiga (sem mesa) com id menor que uma reserva com mesa gravada
+    legacy = Reservation(user_id=user.id, date=day.isoformat(), time="19:00",
+                         starts_at=starts_at, people_count=2, status=ReservationStatus.PENDING)
+    db.add(legacy)
+    db.commit()
+    assigned = Reservation(user_id=user.id, date=day.isoformat(), time="19:00",
+                           starts_at=starts_at, people_count=2, table_id=smallest,
+                           duration_minutes=90, status=ReservationStatus.PENDING)
+    db.add(assigned)
+    db.commit()
+
+    free_tables = len(_tables_for(db, 2)) - 2
+    codes = [_book(client, headers, day.isoformat(), "19:00").status_code
+             for _ in range(free_tables + 1)]
+    assert codes == [201] * free_tables + [400]
+
+
+def test_failed_move_keeps_index_consistent(client, db, make_user):
+    _, headers = make_user()
+    day = next(_days).isoformat()
+    largest = _tables_for(db, 6)
+
+    moved = _book(client, headers, day, "12:00", people=6).json()
+    for _ in largest:
+        assert _book(client, headers, day, "19:00", people=6).status_code == 201
+
+    # Dia fora do índice (ex.: depois de reiniciar) e mudança sem mesa livre
+    table_allocator.forget(day)
+    response = client.put(f"/api/reservations/{moved['id']}", headers=headers,
+                          json={"time": "19:00"})
+    assert response.status_code == 400
+
+    # A reserva continua às 12:00 na mesma mesa: sobra só a outra mesa grande
+    codes = [_book(client, headers, day, "12:00", people=6).status_code for _ in largest]
+    assert codes == [201] * (len(largest) - 1) + [400]
+    rows = db.query(Reservation).filter(
+        Reservation.date == day, Reservation.time == "12:00"
+    ).all()
+    assert len({row.table_id for row in rows}) == len(rows)
+
+
+def test_concurrent_bookings_get_distinct_tables(db, make_user):
+    day = next(_days).isoformat()
+    tables = _tables_for(db, 4)
+    headers = [h for _, h in (make_user() for _ in range(30))]
+
+    with TestClient(app) as client, ThreadPoolExecutor(16) as executor:
+        responses = list(executor.map(
+            lambda h: _book(client, h, day, "20:00", people=4), headers
+        ))
+
+    created = [r.json() for r in responses if r.status_code == 201]
+    assert sorted(r.status_code for r in responses) == [201] * len(tables) + [400] * (30 - len(tables))
+    assert sorted(r["table_id"] for r in created) == sorted(tables)
+
+
+def test_season_availability(client, db, make_user):
+    """
+    Temporada de 62 dias com a casa quase cheia: a disponibilidade carrega
+    cada dia com uma consulta e responde sem depender do nº de reservas
+    """
+    user, _ = make_user()
+    first = next(_days)
+    for _ in range(61):
+        next(_days)
+    grid = slot_grid()
+    tables = table_allocator.tables(db)
+
+    # Todas as mesas ocupadas em blocos de 90 min; só o fim do dia fica livre
+    booked, open_slots = grid[:-3], grid[-3:]
+    rows = []
+    for offset in range(62):
+        day = first + timedelta(days=offset)
+        for slot in booked[::3]:
+            starts_at = datetime.combine(day, datetime.strptime(slot, "%H:%M").time())
+            for seats, table_id in tables:
+                rows.append(Reservation(
+                    user_id=user.id, date=day.isoformat(), time=slot, starts_at=starts_at,
+                    people_count=seats, table_id=table_id, duration_minutes=90,
+                    status=ReservationStatus.CONFIRMED
+                ))
+    db.add_all(rows)
+    db.commit()
+
+    started = time.perf_counter()
+    response = client.get("/api/reservations/availability", params={
+        "from": first.isoformat(), "to": (first + timedelta(days=61)).isoformat(), "people": 2
+    })
+    elapsed = time.perf_counter() - started
+    print(f"{len(rows)} reservas, 62 dias: {elapsed * 1000:.0f} ms")
+
+    assert response.status_code == 200
+    days = response.json()
+    assert len(days) == 62
+    assert all(day["open_slots"] == open_slots for day in days)
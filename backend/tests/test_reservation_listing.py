@@ -0,0 +1,49 @@
+"""
+Listagem de reservas paginada por cursor em (starts_at, id)
+"""
+from datetime import datetime, timedelta
+
+from models import Reservation, ReservationStatus
+
+
+def _pages(client, url, headers, limit):
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        items.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+def test_pages_skip_rows_without_starts_at(client, db, make_user):
+    user, headers = make_user()
+    first = datetime(2032, 3, 1, 18, 0)
+    valid = [
+        Reservation(user_id=user.id, date=(first + timedelta(days=n)).date().isoformat(),
+                    time="18:00", starts_at=first + timedelta(days=n), people_count=2,
+                    status=ReservationStatus.PENDING)
+        for n in (2, 0, 1, 1)
+    ]
+    # Linhas antigas que o backfill não conseguiu converter
+    legacy = [
+        Reservation(user_id=user.id, date="01/03/2032", time="18h", people_count=2,
+                    status=ReservationStatus.PENDING)
+        for _ in range(3)
+    ]
+    db.add_all(legacy[:1] + valid[:2] + legacy[1:] + valid[2:])
+    db.commit()
+
+    items = _pages(client, f"/api/reservations/user/{user.id}", headers, limit=1)
+
+    expected = sorted(valid, key=lambda r: (r.starts_at, r.id))
+    assert [item["id"] for item in items] == [r.id for r in expected]
+
+
+def test_invalid_cursor(client, make_user):
+    user, headers = make_user()
+    response = client.get(f"/api/reservations/user/{user.id}",
+                          params={"cursor": "nao-e-um-cursor"}, headers=headers)
+    assert response.status_code == 400
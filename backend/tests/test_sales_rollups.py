@@ -0,0 +1,53 @@
+"""
+Rollups de vendas mantidos incrementalmente (pedidos, checkout e
+cancelamentos) devem bater com o recálculo a partir do histórico
+"""
+from models import Cart, DailyProductSales, DailySales, UserRole
+from utils.sales import rebuild_sales_rollups
+
+
+def _snapshot(db):
+    db.expire_all()
+    daily = {
+        row.day: (row.orders_count, round(row.revenue, 2))
+        for row in db.query(DailySales)
+    }
+    per_product = {
+        (row.day, row.product_id): (row.units, round(row.revenue, 2))
+        for row in db.query(DailyProductSales)
+    }
+    return daily, per_product
+
+
+def test_incremental_rollups_match_rebuild(client, db, make_user, make_products):
+    _, admin = make_user(UserRole.ADMIN)
+    buyer, headers = make_user()
+    first, second, third = make_products(3, price=2.5)
+
+    order_ids = []
+    for items in ([(first, 2), (second, 1)], [(second, 3), (third, 1)], [(third, 4), (first, 1)]):
+        response = client.post("/api/orders", headers=headers, json={
+            "items": [{"product_id": pid, "quantity": qty} for pid, qty in items]
+        })
+        assert response.status_code == 201
+        order_ids.append(response.json()["id"])
+
+    db.add_all([
+        Cart(user_id=buyer.id, product_id=third, quantity=2),
+        Cart(user_id=buyer.id, product_id=first, quantity=1),
+    ])
+    db.commit()
+    assert client.post("/api/cart/checkout", headers=headers).status_code == 200
+
+    # Cancelamento individual, reabertura e cancelamento em lote
+    for new_status in ("cancelled", "pending"):
+        response = client.put(f"/api/orders/{order_ids[0]}/status", headers=admin,
+                              json={"status": new_status})
+        assert response.status_code == 200
+    response = client.put("/api/orders/status", headers=admin,
+                            json={"order_ids": order_ids[1:], "status": "cancelled"})
+    assert response.status_code == 200
+
+    incremental = _snapshot(db)
+    rebuild_sales_rollups(db)
+    assert _snapshot(db) == incremental
@@ -0,0 +1,83 @@
+"""
+Arquivamento de pedidos antigos (particionamento quente/frio)
+Move pedidos COMPLETED/CANCELLED mais antigos que N dias para as tabelas
+archived_orders/archived_order_items, em lotes com transações curtas.
+Os pedidos mantêm o ID original no arquivo, então o ID nunca pode voltar
+a ser usado nas tabelas quentes: o SQLite (sem AUTOINCREMENT) dá a uma
+nova linha max(id) + 1, e arquivar a linha de maior ID faria o próximo
+pedido repetir esse ID. Por isso o pedido (e o item) de maior ID ficam
+sempre nas tabelas quentes até surgir um mais novo.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, OrderStatus
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = 500
+
+ARCHIVABLE_STATUSES = (OrderStatus.COMPLETED, OrderStatus.CANCELLED)
+
+
+def archive_orders(
+    db: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """
+    Arquiva pedidos finalizados antigos. Cada lote é copiado e removido das
+    tabelas quentes em uma transação própria (INSERT ... SELECT + DELETE).
+    Retorna o total de pedidos arquivados.
+    """
+    archived_at = datetime.utcnow()
+    cutoff = archived_at - timedelta(days=older_than_days)
+    archived = 0
+
+    max_order_id = db.execute(select(func.max(Order.id))).scalar()
+    max_item_id = db.execute(select(func.max(OrderItem.id))).scalar()
+    # Pedido dono do item de maior ID (mesmo motivo: o ID do item seria reusado)
+    holds_max_item = Order.id.in_(
+        select(OrderItem.order_id).where(OrderItem.id == max_item_id)
+    )
+
+    while True:
+        order_ids = db.execute(
+            select(Order.id).where(
+                Order.status.in_(ARCHIVABLE_STATUSES),
+                Order.created_at < cutoff,
+                Order.id < max_order_id,
+                ~holds_max_item
+            ).order_by(Order.id).limit(batch_size)
+        ).scalars().all()
+
+        if not order_ids:
+            break
+
+        try:
+            db.execute(insert(ArchivedOrder).from_select(
+                ["id", "user_id", "total", "status", "created_at", "archived_at"],
+                select(
+                    Order.id, Order.user_id, Order.total, Order.status, Order.created_at,
+                    literal(archived_at, DateTime)
+                ).where(Order.id.in_(order_ids))
+            ))
+            db.execute(insert(ArchivedOrderItem).from_select(
+                ["id", "order_id", "product_id", "quantity", "price"],
+                select(
+                    OrderItem.id, OrderItem.order_id, OrderItem.product_id,
+                    OrderItem.quantity, OrderItem.price
+                ).where(OrderItem.order_id.in_(order_ids))
+            ))
+            db.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+            db.execute(delete(Order).where(Order.id.in_(order_ids)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        archived += len(order_ids)
+
+    return archived
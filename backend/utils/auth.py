@@ -1,7 +1,10 @@
 """
 Utilidades para autenticação JWT e criptografia de senha
 """
+import hashlib
 import os
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -13,17 +16,107 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import User
 from schemas import TokenData
+from utils.cache import TTLCache
+from utils.revocation import revocation_filter
 
 # Configurações de segurança
 SECRET_KEY = os.getenv("SECRET_KEY", "sua-chave-secreta-super-segura-mude-em-producao-2024")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
+# Access tokens de vida curta; a sessão é renovada com o refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+
+# Cache do usuário autenticado por id (evita uma consulta por requisição)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+# Cache de tokens já verificados (claims decodificados até o `exp`)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
 
 # Contexto de criptografia de senha
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# Mesmo esquema, sem 401 automático (rotas em que o token é opcional)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+
+class CurrentUser:
+    """
+    Usuário autenticado da requisição (cópia sem vínculo com a sessão).
+    Compartilhado entre requisições pelo cache: tratar como somente leitura.
+    """
+    __slots__ = ("id", "name", "email", "role")
+
+    def __init__(self, id: int, name: str, email: str, role: str):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(user.id, user.name, user.email, user.role)
+
+
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Remove o usuário do cache (chamar após alterar nome, email ou papel)"""
+    user_cache.delete(user_id)
+
+
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def decode_token(token: str) -> TokenData:
+    """
+    Valida o token e devolve os claims. Tokens já verificados são servidos
+    do cache (sem HMAC nem parsing) até o `exp`. Levanta JWTError/ValueError
+    se o token for inválido ou expirado (revogação é verificada à parte).
+    """
+    digest = _token_digest(token)
+    token_data = token_cache.get(digest)
+    if token_data is not None:
+        return token_data
+    
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    email = payload.get("sub")
+    if email is None:
+        raise JWTError("Token sem sub")
+    token_data = TokenData(
+        email=email,
+        user_id=payload.get("uid"),
+        role=payload.get("role"),
+        jti=payload.get("jti"),
+        exp=payload.get("exp")
+    )
+    
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        token_cache.set(digest, token_data, ttl=remaining)
+    return token_data
+
+
+def revoke_token(db: Session, token: str) -> Optional[TokenData]:
+    """
+    Hook de revogação: remove o token do cache e grava o seu jti no filtro
+    de revogação até expirar (mesmo que a assinatura continue válida).
+    Retorna os claims do token, ou None se ele já era inválido ou expirado.
+    """
+    try:
+        token_data = decode_token(token)
+    except (JWTError, ValueError):
+        return None  # inválido ou expirado: já é recusado
+    token_cache.delete(_token_digest(token))
+    if token_data.jti and token_data.exp:
+        revocation_filter.revoke(db, token_data.jti, datetime.utcfromtimestamp(token_data.exp))
+    return token_data
 
 
 def _truncate_password(password: str) -> str:
@@ -56,6 +149,12 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(truncated_password)
 
 
+def token_claims(user: User) -> dict:
+    """Claims do token de acesso: email (sub), id e papel do usuário"""
+    role = user.role.value if hasattr(user.role, "value") else user.role
+    return {"sub": user.email, "uid": user.id, "role": role}
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Cria token JWT"""
     to_encode = data.copy()
@@ -65,15 +164,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-async def get_current_user(
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> User:
-    """Obtém o usuário atual a partir do token JWT"""
+) -> CurrentUser:
+    """
+    Obtém o usuário atual a partir do token JWT. Tokens com o claim `uid`
+    são resolvidos pelo cache de usuários; o banco só é consultado em
+    caso de falha no cache. Síncrona de propósito: a consulta roda no
+    threadpool e não bloqueia o event loop esperando conexão do pool.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
@@ -81,22 +186,32 @@ async def get_current_user(
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
+        token_data = decode_token(token)
+    except (JWTError, ValueError):
+        raise credentials_exception
+    
+    # Filtro em memória: o banco só é lido se o jti aparecer no filtro
+    if token_data.jti and revocation_filter.is_revoked(db, token_data.jti):
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == token_data.email).first()
+    if token_data.user_id is not None:
+        principal = user_cache.get(token_data.user_id)
+        if principal is not None:
+            return principal
+        user = db.get(User, token_data.user_id)
+    else:
+        # Tokens emitidos antes do claim `uid`
+        user = db.query(User).filter(User.email == token_data.email).first()
+    
     if user is None:
         raise credentials_exception
     
-    return user
+    principal = CurrentUser.from_user(user)
+    user_cache.set(user.id, principal)
+    return principal
 
 
-async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """Verifica se o usuário atual é admin"""
     if current_user.role != "admin":
         raise HTTPException(
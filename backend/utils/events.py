@@ -0,0 +1,92 @@
+"""
+Broker de eventos em memória para o feed ao vivo de pedidos (SSE)
+As rotas publicam eventos (threads do FastAPI) e cada conexão SSE
+recebe-os por uma asyncio.Queue própria. Um buffer circular guarda os
+últimos eventos para retomar conexões a partir do Last-Event-ID.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Any, List, Optional, Tuple
+
+# Evento: (id, tipo, dados)
+Event = Tuple[int, str, Any]
+
+RESYNC_EVENT = "resync"
+
+
+class EventBroker:
+    """Publica eventos para assinantes assíncronos com histórico limitado"""
+
+    def __init__(self, history_size: int = 1000, queue_size: int = 500):
+        self._history: "deque[Event]" = deque(maxlen=history_size)
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self.queue_size = queue_size
+
+    def publish(self, event_type: str, data: Any) -> int:
+        """Registra o evento e entrega a todos os assinantes (thread-safe)"""
+        with self._lock:
+            self._last_id += 1
+            event = (self._last_id, event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Loop já encerrado; a conexão será removida no unsubscribe
+                pass
+        return event[0]
+
+    def _deliver(self, queue: asyncio.Queue, event: Event) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: encerra a conexão; ele reconecta com Last-Event-ID
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Tuple[asyncio.Queue, List[Event]]:
+        """
+        Registra um assinante no loop atual.
+        Retorna a fila e os eventos perdidos desde `last_event_id`.
+        Se o histórico não cobre o intervalo, retorna um evento de resync.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            self._subscribers.append((loop, queue))
+            backlog: List[Event] = []
+            if last_event_id is not None:
+                oldest = self._history[0][0] if self._history else self._last_id + 1
+                if last_event_id > self._last_id or last_event_id < oldest - 1:
+                    backlog = [(self._last_id, RESYNC_EVENT, {})]
+                else:
+                    backlog = [event for event in self._history if event[0] > last_event_id]
+
+        return queue, backlog
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = [(l, q) for l, q in self._subscribers if q is not queue]
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def format_sse(event: Event) -> str:
+    """Formata o evento no protocolo Server-Sent Events"""
+    event_id, event_type, data = event
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+# Feed de pedidos (novos pedidos e mudanças de status)
+order_events = EventBroker()
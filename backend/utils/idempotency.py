@@ -0,0 +1,105 @@
+"""
+Suporte ao header Idempotency-Key
+Guarda a resposta de uma operação por um tempo limitado para que
+reenvios (ex.: Wi-Fi instável) recebam a mesma resposta sem refazer o trabalho.
+"""
+import hashlib
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import HTTPException, Response, status
+
+from utils.cache import TTLCache
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStore:
+    """
+    Respostas armazenadas por (escopo, chave) com TTL.
+    Requisições concorrentes com a mesma chave aguardam a primeira terminar.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 86400.0, wait_timeout: float = 30.0):
+        self._responses = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.wait_timeout = wait_timeout
+
+    def run(
+        self,
+        scope: Hashable,
+        key: Optional[str],
+        fingerprint: str,
+        response: Response,
+        operation: Callable[[], Any]
+    ) -> Any:
+        """
+        Executa `operation` uma única vez por chave e devolve a resposta
+        guardada nos reenvios. Sem chave, apenas executa a operação.
+        A operação deve retornar dados serializáveis (dict/list).
+        """
+        if not key:
+            return operation()
+
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{IDEMPOTENCY_HEADER} deve ter no máximo {MAX_KEY_LENGTH} caracteres"
+            )
+
+        cache_key = (scope, key)
+        digest = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+        while True:
+            with self._lock:
+                stored = self._responses.get(cache_key)
+                if stored is not None:
+                    return self._replay(stored, digest, response)
+
+                event = self._inflight.get(cache_key)
+                if event is None:
+                    # Esta requisição é a dona da chave
+                    event = threading.Event()
+                    self._inflight[cache_key] = event
+                    break
+
+            # Outra requisição com a mesma chave está em andamento
+            if not event.wait(self.wait_timeout):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Requisição com esta Idempotency-Key ainda está em processamento"
+                )
+
+        try:
+            result = operation()
+            # Só respostas de sucesso são guardadas; erros podem ser tentados de novo
+            self._responses.set(cache_key, (digest, result))
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+            event.set()
+
+    @staticmethod
+    def _replay(stored: tuple, digest: str, response: Response) -> Any:
+        stored_digest, result = stored
+        if stored_digest != digest:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key já utilizada com outro conteúdo"
+            )
+        response.headers[REPLAYED_HEADER] = "true"
+        return result
+
+    def stats(self) -> dict:
+        return self._responses.stats()
+
+
+idempotency_store = IdempotencyStore(
+    maxsize=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+)
@@ -0,0 +1,94 @@
+"""
+Migrações simples de schema para bancos já existentes
+O create_all só cria tabelas e índices de tabelas novas; colunas e índices
+novos em tabelas antigas são adicionados aqui, seguidos dos backfills.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, inspect, select, text, update
+
+from database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+# (tabela, coluna, tipo SQL)
+ADDED_COLUMNS = [
+    ("reservations", "table_id", "INTEGER REFERENCES dining_tables(id)"),
+    ("reservations", "duration_minutes", "INTEGER"),
+    ("reservations", "starts_at", "TIMESTAMP"),
+]
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def run_migrations() -> None:
+    """Adiciona colunas e índices que faltam e preenche os dados derivados"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table, column, column_type in ADDED_COLUMNS:
+            if table not in existing_tables:
+                continue
+            columns = {c["name"] for c in inspector.get_columns(table)}
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                logger.info(f"🔧 Coluna {table}.{column} adicionada")
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+    backfill_reservation_starts()
+
+
+def backfill_reservation_starts(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Preenche reservations.starts_at a partir de date/time em lotes (uma
+    transação por lote). Linhas com data/horário inválidos ficam nulas.
+    Retorna o número de linhas preenchidas.
+    """
+    from models import Reservation
+
+    reservations = Reservation.__table__
+    stmt = update(reservations).where(
+        reservations.c.id == bindparam("row_id")
+    ).values(starts_at=bindparam("start"))
+
+    filled = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(reservations.c.id, reservations.c.date, reservations.c.time).where(
+                    reservations.c.starts_at.is_(None),
+                    reservations.c.id > last_id
+                ).order_by(reservations.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            params = []
+            for row_id, day, time in rows:
+                try:
+                    start = datetime.strptime(f"{day} {time}", "%Y-%m-%d %H:%M")
+                except (TypeError, ValueError):
+                    continue
+                params.append({"row_id": row_id, "start": start})
+            if params:
+                conn.execute(stmt, params)
+                filled += len(params)
+
+    if filled:
+        logger.info(f"🔧 {filled} reserva(s) com starts_at preenchido")
+
+    with engine.connect() as conn:
+        invalid = conn.execute(
+            select(func.count()).select_from(reservations).where(reservations.c.starts_at.is_(None))
+        ).scalar()
+    if invalid:
+        logger.warning(f"⚠️ {invalid} reserva(s) com data/horário inválidos ficam fora das listagens")
+    return filled
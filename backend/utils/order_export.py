@@ -0,0 +1,113 @@
+"""
+Exportação de pedidos em streaming (CSV ou NDJSON)
+Lê os itens com cursor do lado do servidor em lotes de tamanho fixo,
+então o uso de memória não depende do período exportado.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select, union_all
+
+from database import SessionLocal
+from models import Order, OrderItem, OrderStatus, ArchivedOrder, ArchivedOrderItem, Product
+
+BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    "order_id", "created_at", "user_id", "status", "order_total",
+    "item_id", "product_id", "product_name", "category", "quantity", "price"
+)
+
+
+def _select_rows(
+    order_model,
+    item_model,
+    order_status: Optional[OrderStatus],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime]
+):
+    """Uma linha por item de pedido de uma tabela (quente ou arquivo)"""
+    stmt = select(
+        order_model.id.label("order_id"),
+        order_model.created_at,
+        order_model.user_id,
+        order_model.status,
+        order_model.total.label("order_total"),
+        item_model.id.label("item_id"),
+        item_model.product_id,
+        Product.name.label("product_name"),
+        Product.category,
+        item_model.quantity,
+        item_model.price
+    ).join(item_model, item_model.order_id == order_model.id).join(
+        Product, Product.id == item_model.product_id
+    )
+    if order_status is not None:
+        stmt = stmt.where(order_model.status == order_status)
+    if date_from is not None:
+        stmt = stmt.where(order_model.created_at >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(order_model.created_at < date_to)
+    return stmt
+
+
+def _export_query(
+    order_status: Optional[OrderStatus],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    include_archived: bool = False
+):
+    """Linhas de exportação ordenadas por pedido e item"""
+    filters = (order_status, date_from, date_to)
+    stmt = _select_rows(Order, OrderItem, *filters)
+    if include_archived:
+        union = union_all(stmt, _select_rows(ArchivedOrder, ArchivedOrderItem, *filters)).subquery()
+        return select(union).order_by(union.c.order_id, union.c.item_id)
+    return stmt.order_by(Order.id, OrderItem.id)
+
+
+def _format_row(row) -> list:
+    values = list(row)
+    values[1] = values[1].isoformat() if values[1] else None
+    values[3] = values[3].value if isinstance(values[3], OrderStatus) else values[3]
+    return values
+
+
+def stream_orders(
+    fmt: str,
+    order_status: Optional[OrderStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    include_archived: bool = False
+) -> Iterator[str]:
+    """
+    Gera o arquivo em pedaços (um por lote). Usa sessão própria porque o
+    stream continua depois que a rota retorna.
+    """
+    db = SessionLocal()
+    try:
+        # yield_per ativa stream_results (cursor nomeado no PostgreSQL)
+        query = _export_query(order_status, date_from, date_to, include_archived)
+        result = db.execute(query.execution_options(yield_per=BATCH_SIZE))
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for batch in result.partitions():
+                writer.writerows(_format_row(row) for row in batch)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+            yield buffer.getvalue()
+        else:
+            for batch in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, _format_row(row))), ensure_ascii=False) + "\n"
+                    for row in batch
+                )
+    finally:
+        db.close()
@@ -0,0 +1,164 @@
+"""
+Pool de processos para hash e verificação de senha (bcrypt)
+O bcrypt gasta 100–300 ms de CPU por chamada; executá-lo em processos
+separados e em número limitado evita que um pico de logins ocupe as
+threads que atendem o resto da API. Acima do limite de fila a requisição
+falha na hora com 503 e Retry-After.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+
+from utils.auth import get_password_hash, verify_password
+
+POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Máximo de operações em andamento (na fila + executando)
+POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", str(POOL_WORKERS * 8)))
+POOL_TIMEOUT = float(os.getenv("PASSWORD_POOL_TIMEOUT", "10"))
+RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_POOL_RETRY_AFTER", "1"))
+# Processos filhos não são criados com fork: o processo da API já tem threads
+# (uvicorn, pool de conexões) e um fork copiaria locks em estado inconsistente
+START_METHOD = os.getenv(
+    "PASSWORD_POOL_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _timed(task: Callable, args: tuple, submitted_at: float) -> tuple:
+    """Executado no processo filho: devolve (resultado, espera na fila, tempo de hash)"""
+    started = time.time()
+    result = task(*args)
+    return result, started - submitted_at, time.time() - started
+
+
+def _warm_up() -> int:
+    """Executado no processo filho na inicialização (sobe o processo e importa as utilidades)"""
+    return os.getpid()
+
+
+class PasswordPool:
+    """Executor de bcrypt com fila limitada e métricas de espera/duração"""
+
+    def __init__(self, workers: int = POOL_WORKERS, max_pending: int = POOL_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hash_total = 0.0
+        self._hash_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            context = multiprocessing.get_context(START_METHOD)
+            if START_METHOD == "forkserver":
+                # O servidor importa o módulo uma vez; os filhos já nascem com ele
+                context.set_forkserver_preload([__name__])
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    def start(self) -> None:
+        """Cria o pool e sobe os processos (chamar na inicialização da API)"""
+        with self._lock:
+            executor = self._get_executor()
+        for future in [executor.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+
+    def _release(self, _future: Any = None) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def _unavailable(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+    def run(self, task: Callable, *args: Any) -> Any:
+        """Executa a tarefa no pool, ou levanta 503 se a fila estiver cheia"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise self._unavailable()
+            self.pending += 1
+            executor = self._get_executor()
+
+        try:
+            future = executor.submit(_timed, task, args, time.time())
+        except (BrokenProcessPool, RuntimeError):
+            self._release()
+            self._failed(executor, broken=True)
+            raise self._unavailable()
+        # O lugar na fila só é liberado quando a tarefa termina de fato
+        # (ou é cancelada), não quando quem esperava desiste
+        future.add_done_callback(self._release)
+
+        try:
+            result, waited, elapsed = future.result(timeout=POOL_TIMEOUT)
+        except FutureTimeoutError:
+            # Ainda na fila: sai sem executar. Já executando: segue até o fim
+            future.cancel()
+            self._failed(executor)
+            raise self._unavailable()
+        except BrokenProcessPool:
+            self._failed(executor, broken=True)
+            raise self._unavailable()
+
+        with self._lock:
+            self.completed += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._hash_total += elapsed
+            self._hash_max = max(self._hash_max, elapsed)
+        return result
+
+    def _failed(self, executor: ProcessPoolExecutor, broken: bool = False) -> None:
+        with self._lock:
+            self.failed += 1
+            # Processo filho morreu: recria o pool na próxima chamada
+            if broken and self._executor is executor:
+                self._executor = None
+
+    def hash(self, password: str) -> str:
+        return self.run(get_password_hash, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self.run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Métricas do pool (tempos em milissegundos)"""
+        with self._lock:
+            done = self.completed
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": done,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "queue_wait_avg_ms": round(self._wait_total / done * 1000, 2) if done else 0.0,
+                "queue_wait_max_ms": round(self._wait_max * 1000, 2),
+                "hash_time_avg_ms": round(self._hash_total / done * 1000, 2) if done else 0.0,
+                "hash_time_max_ms": round(self._hash_max * 1000, 2)
+            }
+
+
+password_pool = PasswordPool()
@@ -0,0 +1,170 @@
+"""
+Importação em massa de produtos (CSV ou NDJSON)
+Lê o arquivo linha a linha e faz upsert em lotes com comandos set-based.
+"""
+import csv
+import io
+import json
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from models import Product
+from schemas import ProductCreate
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+PRODUCT_FIELDS = ("name", "description", "price", "image", "category", "stock")
+
+
+class ImportReport:
+    """Resumo da importação, com erros por linha"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def add_error(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def to_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["row"])
+        }
+
+
+def iter_rows(file: IO[bytes], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Itera o arquivo sem carregá-lo inteiro na memória.
+    Gera (número da linha, dados, erro de parsing).
+    """
+    text_stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(text_stream)
+        for row_number, row in enumerate(reader, start=1):
+            # Campos vazios do CSV viram None (usa o padrão do schema)
+            yield row_number, {k: (v if v != "" else None) for k, v in row.items() if k}, None
+        return
+
+    for row_number, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row_number, None, f"JSON inválido: {exc.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield row_number, data, None
+
+
+def _parse_row(data: dict) -> Tuple[Optional[int], dict]:
+    """
+    Valida a linha com o schema de produto e retorna (id, campos informados).
+    Campos ausentes não são sobrescritos em produtos existentes.
+    """
+    raw_id = data.get("id")
+    product_id = int(raw_id) if raw_id not in (None, "") else None
+    payload = {k: v for k, v in data.items() if k in PRODUCT_FIELDS and v is not None}
+    product = ProductCreate(**payload)
+    return product_id, product.model_dump(exclude_unset=True)
+
+
+def _upsert_batch(db: Session, batch: List[Tuple[int, Optional[int], dict]], report: ImportReport) -> None:
+    """
+    Aplica um lote: uma consulta para achar os existentes (por ID ou nome),
+    um UPDATE em lote e um INSERT em lote.
+    """
+    ids = {product_id for _, product_id, _ in batch if product_id is not None}
+    names = {values["name"] for _, product_id, values in batch if product_id is None}
+
+    existing_ids = set()
+    if ids:
+        existing_ids = {
+            row.id for row in db.query(Product.id).filter(Product.id.in_(ids))
+        }
+
+    id_by_name: Dict[str, int] = {}
+    if names:
+        rows = db.query(Product.id, Product.name).filter(
+            Product.name.in_(names)
+        ).order_by(Product.id.desc())
+        # Em nomes repetidos prevalece o menor ID
+        id_by_name = {row.name: row.id for row in rows}
+
+    updates: Dict[int, dict] = {}
+    inserts: Dict[str, dict] = {}
+
+    for row_number, product_id, values in batch:
+        if product_id is not None:
+            if product_id not in existing_ids:
+                report.add_error(row_number, f"Produto com ID {product_id} não encontrado")
+                continue
+            updates[product_id] = {"id": product_id, **values}
+        elif values["name"] in id_by_name:
+            target_id = id_by_name[values["name"]]
+            updates[target_id] = {"id": target_id, **values}
+        else:
+            # Linhas repetidas no mesmo lote: a última vence
+            inserts[values["name"]] = values
+
+    if updates:
+        db.execute(update(Product), list(updates.values()))
+        report.updated += len(updates)
+    if inserts:
+        db.execute(insert(Product), list(inserts.values()))
+        report.inserted += len(inserts)
+
+
+def import_products(db: Session, file: IO[bytes], fmt: str) -> ImportReport:
+    """
+    Importa produtos de um arquivo CSV/NDJSON em uma única transação.
+    Linhas inválidas são ignoradas e listadas no relatório.
+    """
+    report = ImportReport()
+    batch: List[Tuple[int, Optional[int], dict]] = []
+
+    try:
+        for row_number, data, error in iter_rows(file, fmt):
+            if error:
+                report.add_error(row_number, error)
+                continue
+            try:
+                product_id, values = _parse_row(data)
+            except ValidationError as exc:
+                first = exc.errors()[0]
+                field = ".".join(str(part) for part in first["loc"])
+                report.add_error(row_number, f"{field}: {first['msg']}")
+                continue
+            except (TypeError, ValueError):
+                report.add_error(row_number, "id: deve ser um número inteiro")
+                continue
+
+            batch.append((row_number, product_id, values))
+            if len(batch) >= BATCH_SIZE:
+                _upsert_batch(db, batch, report)
+                batch = []
+
+        if batch:
+            _upsert_batch(db, batch, report)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return report
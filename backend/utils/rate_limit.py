@@ -0,0 +1,118 @@
+"""
+Limitador de taxa por token bucket (em memória)
+Cada chave (IP, email) tem um balde que recarrega `rate` fichas por
+segundo até `burst`. Baldes ociosos já estariam cheios de novo, então são
+descartados sem mudar o resultado: a memória fica limitada às chaves
+ativas (e a `max_keys` no pior caso).
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Tuple
+
+from fastapi import HTTPException, Request, status
+
+
+class TokenBucketLimiter:
+    """Baldes por chave em um OrderedDict (ordem = último uso)"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 100000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        # Tempo para um balde vazio encher: depois disso ele equivale a um balde novo
+        self.idle_after = burst / self.rate
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            key, (_, last) = next(iter(self._buckets.items()))
+            if now - last < self.idle_after and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+            self.evicted += 1
+
+    def acquire(self, key: Hashable) -> float:
+        """Consome uma ficha. Retorna 0 se permitido, ou os segundos até a próxima ficha"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                self.allowed += 1
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                wait = (1 - tokens) / self.rate
+
+            self._evict(now)
+            return wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "keys": len(self._buckets),
+                "max_keys": self.max_keys,
+                "rate_per_minute": round(self.rate * 60, 2),
+                "burst": self.burst,
+                "allowed": self.allowed,
+                "rejected": self.rejected,
+                "evicted": self.evicted
+            }
+
+
+MAX_KEYS = int(os.getenv("LOGIN_LIMIT_MAX_KEYS", "100000"))
+# Número de proxies reversos confiáveis na frente da API (Render/Easypanel: 1).
+# Cada proxy acrescenta o IP de quem o chamou ao fim do X-Forwarded-For; o
+# começo do header vem do cliente e pode ser forjado, então o IP real é o
+# acrescentado pelo proxy mais externo: a entrada N a partir da direita.
+# Com 0 (acesso direto) o header é ignorado.
+_LEGACY_TRUST_PROXY = os.getenv("LOGIN_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes")
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1" if _LEGACY_TRUST_PROXY else "0"))
+
+login_ip_limiter = TokenBucketLimiter(
+    rate_per_minute=float(os.getenv("LOGIN_LIMIT_IP_PER_MINUTE", "30")),
+    burst=int(os.getenv("LOGIN_LIMIT_IP_BURST", "10")),
+    max_keys=MAX_KEYS
+)
+login_email_limiter = TokenBucketLimiter(
+    rate_per_minute=float(os.getenv("LOGIN_LIMIT_EMAIL_PER_MINUTE", "5")),
+    burst=int(os.getenv("LOGIN_LIMIT_EMAIL_BURST", "5")),
+    max_keys=MAX_KEYS
+)
+
+
+def client_ip(request: Request) -> str:
+    """IP do cliente para o limite de tentativas (ver TRUSTED_PROXY_HOPS)"""
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [
+            entry.strip()
+            for header in request.headers.getlist("X-Forwarded-For")
+            for entry in header.split(",")
+            if entry.strip()
+        ]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+def check_login_rate(request: Request, email: str) -> None:
+    """Levanta 429 se o IP ou o email excederam a taxa de tentativas de login"""
+    wait = login_ip_limiter.acquire(client_ip(request))
+    if not wait:
+        wait = login_email_limiter.acquire(email.strip().lower())
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente em instantes",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
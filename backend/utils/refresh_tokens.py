@@ -0,0 +1,116 @@
+"""
+Refresh tokens com rotação
+O token é um valor aleatório opaco; o banco guarda só o hash. Cada uso
+revoga o token apresentado e emite outro da mesma família. Reapresentar um
+token já usado indica vazamento: a família inteira é revogada. A exceção é
+o token rotacionado há poucos segundos (duas abas renovando ao mesmo
+tempo): dentro da janela de tolerância ele ainda rende um token da família.
+"""
+import hashlib
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models import RefreshToken
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+# Tolerância (segundos) para reapresentar um token que acabou de ser rotacionado
+REFRESH_TOKEN_REUSE_GRACE = int(os.getenv("REFRESH_TOKEN_REUSE_GRACE", "30"))
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido ou expirado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """Cria um refresh token (o commit fica com quem chama)"""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
+
+def revoke_family(db: Session, family_id: str) -> None:
+    """Revoga todos os tokens ainda ativos de uma família"""
+    db.execute(
+        update(RefreshToken).where(
+            RefreshToken.family_id == family_id,
+            RefreshToken.revoked_at.is_(None)
+        ).values(revoked_at=datetime.utcnow())
+    )
+
+
+def _recently_rotated(db: Session, row: RefreshToken, now: datetime) -> bool:
+    """
+    O token foi rotacionado dentro da janela de tolerância e a família
+    continua ativa (logout e detecção de vazamento revogam todos os tokens)
+    """
+    revoked_at = db.query(RefreshToken.revoked_at).filter(RefreshToken.id == row.id).scalar()
+    if revoked_at is None or now - revoked_at > timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE):
+        return False
+    return db.query(RefreshToken.id).filter(
+        RefreshToken.family_id == row.family_id,
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > now
+    ).first() is not None
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[int, str]:
+    """
+    Troca um refresh token válido por um novo da mesma família.
+    Retorna (user_id, novo token); o commit fica com quem chama.
+    """
+    row = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash(token)).first()
+    now = datetime.utcnow()
+    if row is None or row.expires_at <= now:
+        raise _invalid_refresh_token()
+
+    # UPDATE condicional: de duas rotações concorrentes só uma vence
+    claimed = db.execute(
+        update(RefreshToken).where(
+            RefreshToken.id == row.id,
+            RefreshToken.revoked_at.is_(None)
+        ).values(revoked_at=now)
+    ).rowcount
+    if not claimed:
+        if _recently_rotated(db, row, now):
+            # Rotação concorrente (outra aba): emite outro token da família
+            return row.user_id, issue_refresh_token(db, row.user_id, row.family_id)
+        # Token já usado ou revogado: possível vazamento
+        revoke_family(db, row.family_id)
+        db.commit()
+        raise _invalid_refresh_token()
+
+    return row.user_id, issue_refresh_token(db, row.user_id, row.family_id)
+
+
+def revoke_refresh_token(db: Session, token: str) -> Optional[int]:
+    """
+    Revoga a família do token (logout). Quem tem o refresh token pode
+    encerrar a sessão, mesmo com o access token expirado.
+    Retorna o id do usuário, ou None se o token não existe.
+    """
+    row = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash(token)).first()
+    if row is None:
+        return None
+    revoke_family(db, row.family_id)
+    db.commit()
+    return row.user_id
@@ -0,0 +1,284 @@
+"""
+Motor de alocação de mesas e índice de ocupação das reservas
+Cada dia carregado guarda, por mesa, os intervalos ocupados em listas
+ordenadas: verificar conflito é uma busca binária (O(log n)) em vez de
+varrer as reservas do dia. O índice é carregado do banco por dia (sob
+demanda) e atualizado pelas rotas de criação, edição e cancelamento.
+"""
+import os
+import threading
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import DiningTable, Reservation, ReservationStatus
+
+# Grade de horários oferecidos para reserva
+OPENING_TIME = os.getenv("RESERVATION_OPEN", "10:00")
+CLOSING_TIME = os.getenv("RESERVATION_CLOSE", "22:00")
+SLOT_MINUTES = int(os.getenv("RESERVATION_SLOT_MINUTES", "30"))
+
+# Duração padrão de uma reserva (minutos)
+DEFAULT_DURATION = int(os.getenv("RESERVATION_DURATION", "90"))
+
+# Mesas criadas quando o banco não tem nenhuma: "lugares:quantidade,..."
+DEFAULT_TABLES = os.getenv("RESERVATION_TABLES", "2:4,4:4,6:2")
+
+
+def to_minutes(time: str) -> int:
+    """Converte HH:MM em minutos desde a meia-noite"""
+    parsed = datetime.strptime(time, "%H:%M")
+    return parsed.hour * 60 + parsed.minute
+
+
+def day_key(reservation: Reservation) -> str:
+    """Dia (YYYY-MM-DD) da reserva no índice, derivado de starts_at"""
+    if reservation.starts_at is not None:
+        return reservation.starts_at.date().isoformat()
+    return reservation.date  # linha antiga sem starts_at: fica fora do índice
+
+
+def _start_minutes(reservation: Reservation) -> int:
+    return reservation.starts_at.hour * 60 + reservation.starts_at.minute
+
+
+def slot_grid() -> List[str]:
+    """Horários (HH:MM) da grade, do horário de abertura até o último antes do fechamento"""
+    start = datetime.strptime(OPENING_TIME, "%H:%M")
+    end = datetime.strptime(CLOSING_TIME, "%H:%M")
+    slots = []
+    current = start
+    while current < end:
+        slots.append(current.strftime("%H:%M"))
+        current += timedelta(minutes=SLOT_MINUTES)
+    return slots
+
+
+class DaySchedule:
+    """
+    Intervalos [início, fim) ocupados por mesa em um dia.
+    As listas de cada mesa ficam ordenadas e sem sobreposição.
+    """
+
+    def __init__(self, table_ids: List[int]):
+        self._intervals: Dict[int, List[Tuple[int, int, int]]] = {tid: [] for tid in table_ids}
+        self._by_reservation: Dict[int, Tuple[int, int, int]] = {}
+
+    def is_free(self, table_id: int, start: int, end: int, ignore: Optional[int] = None) -> bool:
+        """Verifica se a mesa está livre no intervalo (busca binária)"""
+        intervals = self._intervals.get(table_id, [])
+        i = bisect_left(intervals, (start,))
+
+        # Anterior: o último que começa antes de `start` não pode terminar depois dele
+        j = i - 1
+        while j >= 0 and intervals[j][2] == ignore:
+            j -= 1
+        if j >= 0 and intervals[j][1] > start:
+            return False
+
+        # Seguinte: o primeiro que começa em/depois de `start` não pode começar antes de `end`
+        k = i
+        while k < len(intervals) and intervals[k][2] == ignore:
+            k += 1
+        if k < len(intervals) and intervals[k][0] < end:
+            return False
+        return True
+
+    def add(self, table_id: int, start: int, end: int, reservation_id: int) -> None:
+        self._intervals.setdefault(table_id, [])
+        insort(self._intervals[table_id], (start, end, reservation_id))
+        self._by_reservation[reservation_id] = (table_id, start, end)
+
+    def remove(self, reservation_id: int) -> None:
+        entry = self._by_reservation.pop(reservation_id, None)
+        if entry is None:
+            return
+        table_id, start, end = entry
+        intervals = self._intervals[table_id]
+        i = bisect_left(intervals, (start, end, reservation_id))
+        if i < len(intervals) and intervals[i][2] == reservation_id:
+            intervals.pop(i)
+
+
+class TableAllocator:
+    """
+    Aloca reservas em mesas por capacidade (menor mesa que comporta o grupo)
+    e mantém a ocupação por dia. Operações de um mesmo dia são serializadas
+    por um lock próprio, então reservas concorrentes não recebem a mesma mesa.
+    """
+
+    def __init__(self):
+        self._tables: Optional[List[Tuple[int, int]]] = None  # (seats, id), ordenado
+        self._days: Dict[str, DaySchedule] = {}
+        self._day_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    # ----- Mesas -----
+    def tables(self, db: Session) -> List[Tuple[int, int]]:
+        if self._tables is None:
+            with self._lock:
+                if self._tables is None:
+                    rows = db.query(DiningTable.seats, DiningTable.id).all()
+                    if not rows:
+                        rows = self._create_default_tables(db)
+                    self._tables = sorted(rows)
+        return self._tables
+
+    @staticmethod
+    def _create_default_tables(db: Session) -> List[Tuple[int, int]]:
+        created = []
+        for spec in DEFAULT_TABLES.split(","):
+            seats, count = (int(part) for part in spec.split(":"))
+            for _ in range(count):
+                table = DiningTable(name=f"Mesa {len(created) + 1}", seats=seats)
+                db.add(table)
+                created.append(table)
+        db.commit()
+        return [(table.seats, table.id) for table in created]
+
+    def max_seats(self, db: Session) -> int:
+        tables = self.tables(db)
+        return tables[-1][0] if tables else 0
+
+    # ----- Dias -----
+    @contextmanager
+    def lock(self, *days: str) -> Iterator[None]:
+        """Serializa alocações nos dias informados (ordem fixa evita deadlock)"""
+        with self._lock:
+            locks = [
+                self._day_locks.setdefault(day, threading.Lock())
+                for day in sorted(set(days))
+            ]
+        for day_lock in locks:
+            day_lock.acquire()
+        try:
+            yield
+        finally:
+            for day_lock in reversed(locks):
+                day_lock.release()
+
+    def schedule(self, db: Session, day: str) -> DaySchedule:
+        """Ocupação do dia (carregada do banco na primeira consulta)"""
+        schedule = self._days.get(day)
+        if schedule is not None:
+            return schedule
+
+        tables = self.tables(db)
+        schedule = DaySchedule([table_id for _, table_id in tables])
+        day_start = datetime.fromisoformat(day)
+        reservations = db.query(Reservation).filter(
+            Reservation.starts_at >= day_start,
+            Reservation.starts_at < day_start + timedelta(days=1),
+            Reservation.status != ReservationStatus.CANCELLED
+        ).order_by(Reservation.id).all()
+
+        # Primeiro as reservas com mesa gravada; as antigas (sem mesa) ocupam
+        # depois a melhor mesa que sobrou, sem tomar a mesa de outra reserva
+        legacy = []
+        for reservation in reservations:
+            start = _start_minutes(reservation)
+            end = start + (reservation.duration_minutes or DEFAULT_DURATION)
+            if reservation.table_id is None:
+                legacy.append((reservation, start, end))
+            else:
+                schedule.add(reservation.table_id, start, end, reservation.id)
+
+        for reservation, start, end in legacy:
+            table_id = self._best_fit(schedule, tables, reservation.people_count, start, end)
+            if table_id is not None:
+                schedule.add(table_id, start, end, reservation.id)
+
+        self._days[day] = schedule
+        return schedule
+
+    @staticmethod
+    def _best_fit(
+        schedule: DaySchedule,
+        tables: List[Tuple[int, int]],
+        people: int,
+        start: int,
+        end: int,
+        ignore: Optional[int] = None
+    ) -> Optional[int]:
+        # Mesas ordenadas por lugares: a primeira livre é a menor que comporta o grupo
+        first = bisect_left(tables, (people,))
+        for _, table_id in tables[first:]:
+            if schedule.is_free(table_id, start, end, ignore):
+                return table_id
+        return None
+
+    def find_table(
+        self,
+        db: Session,
+        day: str,
+        time: str,
+        people: int,
+        duration: int = DEFAULT_DURATION,
+        ignore: Optional[int] = None
+    ) -> Optional[int]:
+        """Menor mesa livre que comporta o grupo (chamar com o lock do dia)"""
+        start = to_minutes(time)
+        schedule = self.schedule(db, day)
+        return self._best_fit(schedule, self.tables(db), people, start, start + duration, ignore)
+
+    def add(self, reservation: Reservation) -> None:
+        """Registra uma reserva já gravada (chamar com o lock do dia)"""
+        if reservation.starts_at is None or reservation.status == ReservationStatus.CANCELLED:
+            return
+        schedule = self._days.get(day_key(reservation))
+        if schedule is None:
+            return
+        start = _start_minutes(reservation)
+        duration = reservation.duration_minutes or DEFAULT_DURATION
+        schedule.add(reservation.table_id, start, start + duration, reservation.id)
+
+    def release(self, day: str, reservation_id: int) -> None:
+        """Libera a mesa de uma reserva (chamar com o lock do dia)"""
+        schedule = self._days.get(day)
+        if schedule is not None:
+            schedule.remove(reservation_id)
+
+    def forget(self, *days: str) -> None:
+        """Descarta a ocupação dos dias (recarregada do banco na próxima consulta)"""
+        with self._lock:
+            for day in days:
+                self._days.pop(day, None)
+
+    def evict_before(self, day: str) -> None:
+        """Descarta dias passados"""
+        with self._lock:
+            for key in [d for d in self._days if d < day]:
+                del self._days[key]
+                self._day_locks.pop(key, None)
+
+
+def available_slots(db: Session, date_from: date, date_to: date, people: int = 1) -> List[dict]:
+    """Horários da grade com mesa livre para o grupo, por dia (intervalo inclusivo)"""
+    today = date.today()
+    table_allocator.evict_before(today.isoformat())
+
+    days = []
+    current = max(date_from, today)
+    while current <= date_to:
+        days.append(current.isoformat())
+        current += timedelta(days=1)
+
+    grid = slot_grid()
+    now = datetime.now().strftime("%H:%M")
+
+    result = []
+    for day in days:
+        with table_allocator.lock(day):
+            open_slots = [
+                slot for slot in grid
+                if (day != today.isoformat() or slot > now)
+                and table_allocator.find_table(db, day, slot, people) is not None
+            ]
+        result.append({"date": day, "open_slots": open_slots})
+    return result
+
+
+table_allocator = TableAllocator()
@@ -0,0 +1,140 @@
+"""
+Filtro de revogação de access tokens
+Os jti revogados ficam na tabela revoked_tokens e em um filtro de Bloom em
+memória. A verificação por requisição consulta só o filtro (O(1)); o banco
+é lido apenas quando o filtro acusa o jti (revogado de fato ou falso
+positivo, ~1% com a capacidade configurada).
+"""
+import hashlib
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from models import RefreshToken, RevokedToken
+
+FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.01"))
+
+
+class BloomFilter:
+    """Conjunto aproximado: sem falsos negativos, falsos positivos ~error_rate"""
+
+    def __init__(self, capacity: int, error_rate: float, items: Iterable[str] = ()):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        for item in items:
+            self.add(item)
+
+    def _positions(self, item: str):
+        # Double hashing: k posições a partir de dois hashes de 64 bits
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationFilter:
+    """
+    Filtro de Bloom dos jti revogados, carregado da tabela no primeiro uso
+    (ou na inicialização) e reconstruído (sem os já expirados) quando enche.
+    A leitura da tabela e a troca do filtro acontecem sob o lock, o mesmo
+    que `revoke` usa para adicionar ao filtro atual: um jti revogado durante
+    a reconstrução entra na leitura ou é adicionado ao filtro novo.
+    """
+
+    def __init__(self, capacity: int = FILTER_CAPACITY, error_rate: float = FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom: Optional[BloomFilter] = None
+        self._count = 0
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.filter_hits = 0
+        self.confirmed = 0
+
+    def load(self, db: Session) -> None:
+        """(Re)constrói o filtro a partir das revogações ainda não expiradas"""
+        with self._lock:
+            jtis = [
+                jti for (jti,) in db.query(RevokedToken.jti).filter(
+                    RevokedToken.expires_at >= datetime.utcnow()
+                )
+            ]
+            self._bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate, jtis)
+            self._count = len(jtis)
+
+    def _ensure_loaded(self, db: Session) -> BloomFilter:
+        if self._bloom is None:
+            self.load(db)
+        return self._bloom
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        """Verifica se o jti foi revogado (banco só em caso de acerto no filtro)"""
+        bloom = self._ensure_loaded(db)
+        self.checks += 1
+        if jti not in bloom:
+            return False
+
+        self.filter_hits += 1
+        row = db.get(RevokedToken, jti)
+        if row is None:
+            return False
+        self.confirmed += 1
+        return True
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime) -> None:
+        """Grava a revogação e adiciona o jti ao filtro"""
+        self._ensure_loaded(db)
+        if db.get(RevokedToken, jti) is None:
+            db.add(RevokedToken(jti=jti, expires_at=expires_at))
+            db.commit()
+
+        with self._lock:
+            # Filtro atual (não o lido antes do commit: pode ter sido trocado)
+            bloom = self._bloom
+            bloom.add(jti)
+            self._count += 1
+            full = self._count > bloom_capacity(bloom, self.error_rate)
+        if full:
+            self.load(db)
+
+    def stats(self) -> dict:
+        with self._lock:
+            bloom = self._bloom
+            return {
+                "revoked": self._count,
+                "filter_bits": bloom.size if bloom else 0,
+                "filter_hashes": bloom.hashes if bloom else 0,
+                "checks": self.checks,
+                "filter_hits": self.filter_hits,
+                "confirmed": self.confirmed,
+                "false_positives": self.filter_hits - self.confirmed
+            }
+
+
+def bloom_capacity(bloom: BloomFilter, error_rate: float) -> int:
+    """Número de itens que o filtro comporta mantendo a taxa de erro"""
+    return int(bloom.size * math.log(2) ** 2 / -math.log(error_rate))
+
+
+def purge_expired_tokens(db: Session) -> None:
+    """Apaga revogações e refresh tokens que já expiraram (na inicialização)"""
+    now = datetime.utcnow()
+    db.query(RevokedToken).filter(RevokedToken.expires_at < now).delete(synchronize_session=False)
+    db.query(RefreshToken).filter(RefreshToken.expires_at < now).delete(synchronize_session=False)
+    db.commit()
+
+
+revocation_filter = RevocationFilter()
@@ -0,0 +1,162 @@
+"""
+Manutenção incremental dos rollups de vendas (por dia e por produto)
+Os rollups são atualizados na mesma transação que cria ou cancela o pedido,
+então os relatórios leem O(dias) linhas em vez de varrer o histórico.
+"""
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import (
+    ArchivedOrder, ArchivedOrderItem, DailySales, DailyProductSales,
+    Order, OrderItem, OrderStatus, Product
+)
+
+# Item vendido: (product_id, categoria, quantidade, preço unitário)
+SaleItem = Tuple[int, Optional[str], int, float]
+
+
+def _insert_for(db: Session):
+    """INSERT com suporte a ON CONFLICT do dialeto em uso"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _increment(db: Session, model, rows: list, keys: list, counters: list) -> None:
+    """
+    Upsert somando os contadores nas linhas já existentes. As linhas chegam
+    ordenadas pela chave, então transações concorrentes travam as mesmas
+    linhas na mesma ordem. Um único INSERT parametrizado em executemany:
+    compilado uma vez e reaproveitado do cache, qualquer que seja o nº de linhas.
+    """
+    if not rows:
+        return
+    insert = _insert_for(db)
+    table = model.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: table.c[name] + stmt.excluded[name] for name in counters}
+    )
+    db.execute(stmt, rows)
+
+
+def record_sale(
+    db: Session,
+    day: date,
+    items: Iterable[SaleItem],
+    sign: int = 1,
+    orders: int = 1
+) -> None:
+    """
+    Soma (sign=1) ou subtrai (sign=-1, cancelamento) pedidos de um mesmo dia
+    dos rollups. Deve ser chamado dentro da transação do pedido.
+    """
+    per_product: Dict[int, dict] = {}
+    revenue = 0.0
+    for product_id, category, quantity, price in items:
+        row = per_product.setdefault(product_id, {
+            "day": day, "product_id": product_id, "category": category,
+            "units": 0, "revenue": 0.0
+        })
+        row["units"] += sign * quantity
+        row["revenue"] += sign * quantity * price
+        revenue += sign * quantity * price
+
+    _increment(
+        db, DailySales,
+        [{"day": day, "orders_count": sign * orders, "revenue": revenue}],
+        ["day"], ["orders_count", "revenue"]
+    )
+    _increment(
+        db, DailyProductSales,
+        [per_product[product_id] for product_id in sorted(per_product)],
+        ["day", "product_id"], ["units", "revenue"]
+    )
+
+
+def record_orders(db: Session, order_ids: Iterable[int], sign: int = 1) -> None:
+    """
+    Soma/subtrai pedidos já gravados (usado em mudanças de status).
+    Uma consulta para todos os itens e um upsert por dia afetado, em ordem
+    de dia (mesma ordem de locks em todas as transações).
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+
+    rows = db.query(
+        Order.id, Order.created_at,
+        OrderItem.product_id, Product.category, OrderItem.quantity, OrderItem.price
+    ).join(OrderItem, OrderItem.order_id == Order.id).join(
+        Product, Product.id == OrderItem.product_id
+    ).filter(Order.id.in_(order_ids)).all()
+
+    by_day: Dict[date, Tuple[set, list]] = {}
+    for order_id, created_at, product_id, category, quantity, price in rows:
+        day_orders, day_items = by_day.setdefault(created_at.date(), (set(), []))
+        day_orders.add(order_id)
+        day_items.append((product_id, category, quantity, price))
+
+    for day in sorted(by_day):
+        day_orders, day_items = by_day[day]
+        record_sale(db, day, day_items, sign, orders=len(day_orders))
+
+
+def record_order(db: Session, order_id: int, sign: int = 1) -> None:
+    """Soma/subtrai um pedido já gravado"""
+    record_orders(db, [order_id], sign)
+
+
+def rebuild_sales_rollups(db: Session) -> int:
+    """
+    Recalcula os rollups a partir do histórico (pedidos não cancelados,
+    incluindo os arquivados). Usado para preencher os rollups de pedidos
+    anteriores a esta funcionalidade. Retorna o número de dias recalculados.
+    """
+    db.query(DailyProductSales).delete(synchronize_session=False)
+    db.query(DailySales).delete(synchronize_session=False)
+
+    def as_date(value):
+        return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+    daily: Dict[date, dict] = {}
+    per_product: Dict[Tuple[date, int], dict] = {}
+
+    for order_model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        day = func.date(order_model.created_at)
+        active = order_model.status != OrderStatus.CANCELLED
+
+        for d, count, revenue in db.query(
+            day, func.count(order_model.id), func.sum(order_model.total)
+        ).filter(active).group_by(day):
+            row = daily.setdefault(as_date(d), {
+                "day": as_date(d), "orders_count": 0, "revenue": 0.0
+            })
+            row["orders_count"] += count
+            row["revenue"] += revenue or 0
+
+        for d, pid, category, units, revenue in db.query(
+            day, item_model.product_id, func.max(Product.category),
+            func.sum(item_model.quantity), func.sum(item_model.quantity * item_model.price)
+        ).join(order_model, order_model.id == item_model.order_id).join(
+            Product, Product.id == item_model.product_id
+        ).filter(active).group_by(day, item_model.product_id):
+            row = per_product.setdefault((as_date(d), pid), {
+                "day": as_date(d), "product_id": pid, "category": category,
+                "units": 0, "revenue": 0.0
+            })
+            row["units"] += units or 0
+            row["revenue"] += revenue or 0
+
+    if daily:
+        db.bulk_insert_mappings(DailySales, list(daily.values()))
+    if per_product:
+        db.bulk_insert_mappings(DailyProductSales, list(per_product.values()))
+    db.commit()
+    return len(daily)
@@ -0,0 +1,193 @@
+"""
+Índice de busca textual de produtos
+SQLite usa FTS5 e PostgreSQL usa tsvector + GIN. O índice é mantido por
+triggers no próprio banco, então fica sincronizado em qualquer escrita na
+tabela products (rotas de admin, seeds, scripts).
+"""
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# Pesos por coluna: nome > categoria > descrição
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+CATEGORY_WEIGHT = 5.0
+
+# Backend ativo: "sqlite", "postgresql" ou None (fallback com LIKE)
+_backend: Optional[str] = None
+# Se a extensão unaccent está disponível no PostgreSQL
+_pg_unaccent = False
+
+_SQLITE_DDL = [
+    # remove_diacritics faz "Café" casar com "cafe" (índice e consulta)
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+]
+
+_SQLITE_REBUILD = [
+    "DELETE FROM products_fts",
+    """
+    INSERT INTO products_fts(rowid, name, description, category)
+    SELECT id, name, description, category FROM products
+    """,
+]
+
+
+def _pg_ddl(unaccent: bool) -> List[str]:
+    """DDL do PostgreSQL: coluna tsvector, função/trigger de atualização e índice GIN"""
+    wrap = "unaccent({})" if unaccent else "{}"
+
+    def vector(column: str, weight: str) -> str:
+        value = wrap.format(f"coalesce(NEW.{column}, '')")
+        return f"setweight(to_tsvector('portuguese', {value}), '{weight}')"
+
+    return [
+        "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        f"""
+        CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                {vector('name', 'A')} ||
+                {vector('category', 'B')} ||
+                {vector('description', 'C')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS products_search_vector_trigger ON products",
+        """
+        CREATE TRIGGER products_search_vector_trigger
+        BEFORE INSERT OR UPDATE ON products
+        FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_products_search_vector
+        ON products USING GIN (search_vector)
+        """,
+        # Dispara o trigger para preencher linhas já existentes
+        "UPDATE products SET id = id WHERE search_vector IS NULL",
+    ]
+
+
+def init_search_index() -> None:
+    """
+    Cria (se necessário) o índice de busca e os triggers de sincronização.
+    Em caso de falha, a busca continua funcionando com LIKE.
+    """
+    global _backend, _pg_unaccent
+
+    dialect = engine.dialect.name
+    try:
+        if dialect == "sqlite":
+            with engine.begin() as conn:
+                for ddl in _SQLITE_DDL + _SQLITE_REBUILD:
+                    conn.execute(text(ddl))
+            _backend = "sqlite"
+
+        elif dialect == "postgresql":
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+                _pg_unaccent = True
+            except SQLAlchemyError:
+                logger.warning("⚠️ Extensão unaccent indisponível, busca será sensível a acentos")
+                _pg_unaccent = False
+
+            with engine.begin() as conn:
+                for ddl in _pg_ddl(_pg_unaccent):
+                    conn.execute(text(ddl))
+            _backend = "postgresql"
+
+    except SQLAlchemyError as exc:
+        logger.warning(f"⚠️ Índice de busca indisponível ({exc}), usando LIKE")
+        _backend = None
+
+
+def _tokenize(query: str) -> List[str]:
+    """Extrai apenas palavras da consulta (descarta operadores e pontuação)"""
+    return re.findall(r"\w+", query.lower())
+
+
+def search_product_ids(db: Session, query: str, limit: int) -> List[int]:
+    """
+    Retorna IDs de produtos que casam com a consulta, do mais relevante
+    para o menos relevante. Cada palavra é tratada como prefixo.
+    """
+    tokens = _tokenize(query)
+    if not tokens:
+        return []
+
+    if _backend == "sqlite":
+        match = " AND ".join(f'"{token}"*' for token in tokens)
+        rows = db.execute(
+            text(
+                "SELECT rowid FROM products_fts WHERE products_fts MATCH :match "
+                "ORDER BY bm25(products_fts, :w_name, :w_description, :w_category) "
+                "LIMIT :limit"
+            ),
+            {
+                "match": match,
+                "w_name": NAME_WEIGHT,
+                "w_description": DESCRIPTION_WEIGHT,
+                "w_category": CATEGORY_WEIGHT,
+                "limit": limit,
+            },
+        )
+        return [row[0] for row in rows]
+
+    if _backend == "postgresql":
+        tsquery = " & ".join(f"{token}:*" for token in tokens)
+        query_expr = "unaccent(:tsquery)" if _pg_unaccent else ":tsquery"
+        rows = db.execute(
+            text(
+                f"SELECT id FROM products, to_tsquery('portuguese', {query_expr}) AS q "
+                "WHERE search_vector @@ q "
+                "ORDER BY ts_rank(search_vector, q) DESC, id "
+                "LIMIT :limit"
+            ),
+            {"tsquery": tsquery, "limit": limit},
+        )
+        return [row[0] for row in rows]
+
+    # Fallback sem índice
+    conditions = " AND ".join(
+        f"(lower(name) LIKE :t{i} OR lower(description) LIKE :t{i} OR lower(category) LIKE :t{i})"
+        for i in range(len(tokens))
+    )
+    params = {f"t{i}": f"%{token}%" for i, token in enumerate(tokens)}
+    params["limit"] = limit
+    rows = db.execute(
+        text(f"SELECT id FROM products WHERE {conditions} ORDER BY id LIMIT :limit"),
+        params,
+    )
+    return [row[0] for row in rows]
@@ -0,0 +1,40 @@
+"""
+Controle de estoque com baixa atômica
+"""
+from typing import Dict, Optional
+
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+
+from models import Product
+
+
+def reserve_stock(db: Session, quantities: Dict[int, int]) -> bool:
+    """
+    Baixa o estoque de todos os produtos em um único UPDATE condicional:
+    cada linha só é decrementada se ainda tiver estoque suficiente.
+    Retorna False se algum produto não pôde ser reservado; nesse caso o
+    chamador deve fazer rollback da transação.
+    """
+    if not quantities:
+        return True
+
+    quantity = case(quantities, value=Product.id)
+    result = db.execute(
+        update(Product)
+        .where(Product.id.in_(quantities.keys()), Product.stock >= quantity)
+        .values(stock=Product.stock - quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(quantities)
+
+
+def find_insufficient_stock(db: Session, quantities: Dict[int, int]) -> Optional[Product]:
+    """Retorna o primeiro produto sem estoque suficiente (após um rollback)"""
+    products = db.query(Product).filter(
+        Product.id.in_(quantities.keys())
+    ).order_by(Product.id).all()
+    for product in products:
+        if product.stock < quantities[product.id]:
+            return product
+    return None
@@ -69,8 +69,54 @@ export interface OrderItem {
 export interface LoginResponse {
   access_token: string;
   token_type: string;
+  refresh_token?: string;
+  expires_in?: number;
 }
 
+// Store both tokens returned by login/refresh
+const storeTokens = (data: LoginResponse) => {
+  localStorage.setItem('access_token', data.access_token);
+  if (data.refresh_token) {
+    localStorage.setItem('refresh_token', data.refresh_token);
+  }
+};
+
+const clearTokens = () => {
+  localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
+};
+
+// Renews the short-lived access token (one refresh in flight at a time)
+let refreshInFlight: Promise<boolean> | null = null;
+
+const refreshAccessToken = (): Promise<boolean> => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) {
+    return Promise.resolve(false);
+  }
+
+  if (!refreshInFlight) {
+    refreshInFlight = fetch(`${API_URL}/auth/refresh`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    })
+      .then(async response => {
+        if (!response.ok) {
+          clearTokens();
+          return false;
+        }
+        storeTokens(await response.json());
+        return true;
+      })
+      .catch(() => false)
+      .finally(() => {
+        refreshInFlight = null;
+      });
+  }
+  return refreshInFlight;
+};
+
 // Helper function to get auth headers
 const getAuthHeaders = () => {
   const token = localStorage.getItem('access_token');
@@ -88,11 +134,12 @@ class APIError extends Error {
   }
 }
 
-// Generic fetch wrapper
-const apiRequest = async <T>(
+// Generic fetch wrapper (returns the raw response once it is known to be OK)
+const apiFetch = async (
   endpoint: string, 
-  options: RequestInit = {}
-): Promise<T> => {
+  options: RequestInit = {},
+  retried = false
+): Promise<Response> => {
   const url = `${API_URL}${endpoint}`;
   
   console.log('🚀 Fazendo requisição para:', url);
@@ -106,6 +153,13 @@ const apiRequest = async <T>(
     const response = await fetch(url, config);
     console.log('📡 Resposta recebida:', response.status, response.statusText);
     
+    // Access token expired: renew it once and repeat the request
+    if (response.status === 401 && !retried && !endpoint.startsWith('/auth/login')) {
+      if (await refreshAccessToken()) {
+        return apiFetch(endpoint, options, true);
+      }
+    }
+    
     if (!response.ok) {
       const errorData = await response.json().catch(() => null);
       console.error('❌ Erro na API:', response.status, errorData);
@@ -115,12 +169,7 @@ const apiRequest = async <T>(
       );
     }
 
-    // Handle 204 No Content responses
-    if (response.status === 204) {
-      return {} as T;
-    }
-
-    return await response.json();
+    return response;
   } catch (error) {
     if (error instanceof APIError) {
       throw error;
@@ -132,6 +181,40 @@ const apiRequest = async <T>(
   }
 };
 
+const apiRequest = async <T>(
+  endpoint: string, 
+  options: RequestInit = {}
+): Promise<T> => {
+  const response = await apiFetch(endpoint, options);
+
+  // Handle 204 No Content responses
+  if (response.status === 204) {
+    return {} as T;
+  }
+
+  return await response.json();
+};
+
+// Keyset-paginated listings: follows X-Next-Cursor until the last page
+const apiRequestAllPages = async <T>(
+  endpoint: string,
+  pageSize: number
+): Promise<T[]> => {
+  const items: T[] = [];
+  const separator = endpoint.includes('?') ? '&' : '?';
+  let cursor: string | null = null;
+
+  do {
+    const page = `${endpoint}${separator}limit=${pageSize}` +
+      (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+    const response = await apiFetch(page);
+    items.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+
+  return items;
+};
+
 // Auth API
 export const authAPI = {
   async login(email: string, password: string): Promise<LoginResponse> {
@@ -139,8 +222,8 @@ export const authAPI = {
       method: 'POST',
       body: JSON.stringify({ email, password }),
     }).then(data => {
-      // Store token in localStorage
-      localStorage.setItem('access_token', data.access_token);
+      // Store tokens in localStorage
+      storeTokens(data);
       return data;
     });
   },
@@ -157,7 +240,17 @@ export const authAPI = {
   },
 
   logout(): void {
-    localStorage.removeItem('access_token');
+    // Revoke the session server-side (best effort), then drop local tokens.
+    // The refresh token alone is enough, even if the access token expired.
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken || localStorage.getItem('access_token')) {
+      fetch(`${API_URL}/auth/logout`, {
+        method: 'POST',
+        headers: getAuthHeaders(),
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => undefined);
+    }
+    clearTokens();
   },
 
   isAuthenticated(): boolean {
@@ -169,7 +262,7 @@ export const authAPI = {
 export const productsAPI = {
   async getAll(): Promise<Product[]> {
     console.log('🔗 Chamando API de produtos:', `${API_URL}/products`);
-    const result = await apiRequest<Product[]>('/products');
+    const result = await apiRequestAllPages<Product>('/products', 500);
     console.log('📦 Produtos retornados da API:', result);
     return result;
   },
@@ -264,11 +357,11 @@ export const reservationsAPI = {
   },
 
   async getUserReservations(userId: number): Promise<Reservation[]> {
-    return apiRequest<Reservation[]>(`/reservations/user/${userId}`);
+    return apiRequestAllPages<Reservation>(`/reservations/user/${userId}`, 200);
   },
 
   async getAll(): Promise<Reservation[]> {
-    return apiRequest<Reservation[]>('/reservations');
+    return apiRequestAllPages<Reservation>('/reservations', 200);
   },
 
   async updateStatus(id: number, status: string): Promise<Reservation> {
@@ -282,11 +375,11 @@ export const reservationsAPI = {
 // Orders API
 export const ordersAPI = {
   async getUserOrders(userId: number): Promise<Order[]> {
-    return apiRequest<Order[]>(`/orders/user/${userId}`);
+    return apiRequestAllPages<Order>(`/orders/user/${userId}`, 200);
   },
 
   async getAll(): Promise<Order[]> {
-    return apiRequest<Order[]>('/orders');
+    return apiRequestAllPages<Order>('/orders', 200);
   },
 
   async updateStatus(id: number, status: string): Promise<Order> {